@@ -55,7 +55,7 @@ def template_package(path, package):
 
 class Source:
     def __init__(self, cls):
-        self._cls = decorators.undecorate(cls)
+        self._cls = cls
 
     @property
     def source(self):
@@ -87,7 +87,7 @@ class Source:
 
 class Documentation:
     def __init__(self, cls):
-        self._cls = decorators.undecorate(cls)
+        self._cls = cls
     
     @property
     def docstring(self):
@@ -109,7 +109,7 @@ class Documentation:
 
 class Signature:
     def __init__(self, cls):
-        self._cls = decorators.undecorate(cls)
+        self._cls = cls
 
     @property
     def isempty(self):
@@ -132,13 +132,11 @@ class Signature:
     
     @property
     def input(self):
-        found = [h for h in self._hooks if isinstance(h, decorators.InputDescription)]
-        return found[0] if found else None
+        return decorators.hooks(self._cls).input
     
     @property
     def output(self):
-        found = [h for h in self._hooks if isinstance(h, decorators.OutputDescription)]
-        return found[0] if found else None
+        return decorators.hooks(self._cls).output
 
     def render(self):
         if self.isempty: return ""
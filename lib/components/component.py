@@ -16,11 +16,15 @@ class Parameterisable:
     @property
     def params(self): return self.parameters
     
-    def _get_parameter_hooks(self): return self.__parameterhooks[:]
+    #Hooks declared with decorators belong to the class, while those added
+    #to a single instance follow them
+    def _get_parameter_hooks(self): 
+        from actuator.components.decorators import hooks
+        return hooks(type(self)).parameters + tuple(self.__parameterhooks)
     
     def _add_parameter_hook(self, parameter):
-        if parameter.name in self.__parameterhooks:
-            raise Exception("Parameter {} already registered", parameter.name)
+        if parameter.name in [p.name for p in self._get_parameter_hooks()]:
+            raise Exception("Parameter {} already registered".format(parameter.name))
         self.__parameterhooks.append(parameter)
         
     @property
@@ -29,12 +33,12 @@ class Parameterisable:
     @property
     def args(self): return self.arguments
     
-    def _get_argument_hooks(self): return self.__argumenthooks[:]
+    def _get_argument_hooks(self): 
+        from actuator.components.decorators import hooks
+        return hooks(type(self)).arguments + tuple(self.__argumenthooks)
     
     def _add_argument_hook(self, argument):
-        #Arguments will be processed in reverse order due to 
-        #decorator processing order
-        self.__argumenthooks.insert(0, argument)
+        self.__argumenthooks.append(argument)
 
 class Initialisable:
     def initialise(self, *args, **kwargs):
@@ -58,22 +62,37 @@ class Initialisable:
                 supers[0].__init__(self, *args, **kwargs)
             supers = supers[1:]
     
-    def _perform_method(self, base_class, method_name, pass_args, *args, **kwargs):
+    #The methods to call for each (class, base class, method name), in MRO
+    #order. Every decorator adds a subclass, so walking the MRO on each call
+    #is a significant part of building a component
+    __method_plans = {}
+
+    @classmethod
+    def _method_plan(cls, base_class, method_name):
+        key = (cls, base_class, method_name)
+        plan = Initialisable.__method_plans.get(key, None)
+        if plan != None: return plan
         
-        supers = self.__class__.mro()
+        supers = cls.mro()
         if base_class:
             supers = supers[supers.index(base_class)+1:]
+        plan = []
         for sc in supers:
             #Only perform calls for subclasses of Initialisable
             if not issubclass(sc, Initialisable): continue
 
             #See if this superclass has a method we can call
-            has_method = method_name in vars(sc).keys()
-            if not has_method: continue
-            method = sc.__dict__[method_name]
-            if not callable(method): continue
-
-            log.for_custom().debug("Calling %s for specific class %s", method_name, sc)
+            method = vars(sc).get(method_name, None)
+            if method == None or not callable(method): continue
+            plan.append(method)
+        
+        log.for_custom().debug("Calling %s for %s on specific classes %s", method_name, cls, plan)
+        plan = tuple(plan)
+        Initialisable.__method_plans[key] = plan
+        return plan
+    
+    def _perform_method(self, base_class, method_name, pass_args, *args, **kwargs):
+        for method in self._method_plan(base_class, method_name):
             if pass_args:
                 method(self, *args, **kwargs)
             else:
@@ -103,9 +122,6 @@ class Component(Parameterisable, Initialisable):
         
         self.__component_args = list(args)
         self.__component_kwargs = dict(kwargs)
-               
-        self.__input_description = None
-        self.__output_description = None
         
         #Run mixin init methods if this is the first superclass 
         #and there are others after it
@@ -157,6 +173,13 @@ class Component(Parameterisable, Initialisable):
     def initialise(self, *args, **kwargs):
         return
 
+    #The args and kwargs this component was created with, before setup
+    @property
+    def component_args(self): return list(self.__component_args)
+    
+    @property
+    def component_kwargs(self): return dict(self.__component_kwargs)
+
     def start(self): return
     def stop(self): return
 
@@ -206,10 +229,16 @@ class Component(Parameterisable, Initialisable):
         return yaml.dump(self.description_data)
         
     
-    def _set_input_description(self, d):
-        self.__input_description = d
-    def _set_output_description(self, d):
-        self.__output_description = d
+    #The @input and @output descriptions of this component, if any
+    @property
+    def input_description(self):
+        from actuator.components.decorators import hooks
+        return hooks(type(self)).input
+
+    @property
+    def output_description(self):
+        from actuator.components.decorators import hooks
+        return hooks(type(self)).output
         
     @classmethod
     def get_source(cls):
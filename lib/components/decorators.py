@@ -1,37 +1,45 @@
-#returns the inner object that has been decorated
-def undecorate(decorated):
-    #Not everything passed in will be decorated
-    if not hasattr(decorated, '__closure__'): return decorated
-    
-    #Grab the contents of the decoration's closure
-    contents = [cell.cell_contents for cell in decorated.__closure__]
-    
-    #First, we look for a class definition
-    inner = [e for e in contents if isinstance(e, type)]
-    if inner: return inner[0]
-    
-    #Then we look for another nested decorator, and recursively
-    #undecorate it, too.
-    from types import FunctionType
-    inner = [e for e in contents if isinstance(e, FunctionType)]
-    if inner: return undecorate(inner[0])
-    
-    return None
+#Decorators record their hooks on the class they decorate and return that
+#same class, rather than wrapping it in a subclass per decorator. The hooks
+#a component class uses are gathered once, over its whole MRO, by `hooks`
+KEY = '_actuator_decorators'
 
 def register(cls, dec):
-    cls = undecorate(cls)
-    key = '__actuator_decorators'
-    if not hasattr(cls, key): 
-        setattr(cls, key, [])
-    decs = getattr(cls, key)
-    decs.append(dec)
-    setattr(cls, key, decs)
-
+    #Only the class's own hooks, not those inherited from a decorated parent.
+    #Decorators are applied bottom-up, so prepend to keep them in source order
+    if not KEY in vars(cls): 
+        setattr(cls, KEY, [])
+    vars(cls)[KEY].insert(0, dec)
+    __hooks.clear()
+    return cls
+
+#All hooks for a class, those of base classes first
 def lookup(cls):
-    cls = undecorate(cls)
-    key = '__actuator_decorators'
-    if not hasattr(cls, key): return []
-    return getattr(cls, key)
+    found = []
+    for c in reversed(cls.__mro__):
+        found.extend(vars(c).get(KEY, []))
+    return found
+
+
+#The hooks a class needs at construction and setup time, sorted by kind
+class ClassHooks:
+    def __init__(self, cls):
+        found = lookup(cls)
+        self.parameters = tuple(h for h in found if isinstance(h, ParameterHook))
+        self.arguments = tuple(h for h in found if isinstance(h, ArgumentHook))
+        inputs = [h for h in found if isinstance(h, InputDescription)]
+        outputs = [h for h in found if isinstance(h, OutputDescription)]
+        #A subclass's description replaces its parent's
+        self.input = inputs[-1] if inputs else None
+        self.output = outputs[-1] if outputs else None
+        self.specialisations = tuple(h for h in found if isinstance(h, Specialisation))
+
+__hooks = {}
+def hooks(cls):
+    found = __hooks.get(cls, None)
+    if found == None:
+        found = ClassHooks(cls)
+        __hooks[cls] = found
+    return found
 
 
 class ConstructorHook:
@@ -70,8 +78,12 @@ class ParameterSet:
     def __getattr__(self, key):
         return self._params[key]
     
+    #Parameters are also stored as attributes, so reading one is a plain
+    #attribute lookup, unless the name is taken by this class
     def put(self, parameter, value):
         self._params[parameter.name] = value
+        if not hasattr(type(self), parameter.name): 
+            self.__dict__[parameter.name] = value
     
     @property
     def as_dict(self):
@@ -92,15 +104,7 @@ class ParameterHook(ConstructorHook):
 def parameter(name, ptype, default=None, desc=None, parser=None):
     p = ParameterHook(name, ptype, default, desc, parser)
     def inner(cls):
-        class ParameterDecorator(cls):
-            def construct(self):
-                super()._add_parameter_hook(p)
-            @classmethod
-            def get_source(cls):
-                return cls.__bases__[0].get_source()
-                
-        register(cls, p)
-        return ParameterDecorator
+        return register(cls, p)
     return inner
 
 
@@ -114,15 +118,7 @@ class AllParametersHook(ParameterHook):
 def allparameters(name):
     p = AllParametersHook(name)
     def inner(cls):
-        class AllParametersDecorator(cls):
-            def construct(self):
-                super()._add_parameter_hook(p)
-            @classmethod
-            def get_source(cls):
-                return cls.__bases__[0].get_source()
-                
-        register(cls, p)
-        return AllParametersDecorator
+        return register(cls, p)
     return inner
         
 
@@ -141,10 +137,11 @@ class ArgumentList:
     def put(self, argument, value):
         self._args.append(value)
         self._namedargs[argument.name] = value
+        if not hasattr(type(self), argument.name): 
+            self.__dict__[argument.name] = value
         
     def default(self, argument):
-        self._args.append(argument.default)
-        self._namedargs[argument.name] = argument.default
+        self.put(argument, argument.default)
     
     @property
     def as_list(self): 
@@ -166,15 +163,7 @@ class ArgumentHook(ConstructorHook):
 def argument(name, ptype, default=None, desc=None, parser=None):
     a = ArgumentHook(name, ptype, default, desc, parser)
     def inner(cls):
-        class ArgumentDecorator(cls):
-            def construct(self):
-                super()._add_argument_hook(a)
-            @classmethod
-            def get_source(cls):
-                return cls.__bases__[0].get_source()
-                
-        register(cls, a)
-        return ArgumentDecorator
+        return register(cls, a)
     return inner
 
 
@@ -188,15 +177,7 @@ class AllArgumentsHook(ArgumentHook):
 def allarguments(name):
     a = AllArgumentsHook(name)
     def inner(cls):
-        class AllArgumentsDecorator(cls):
-            def construct(self):
-                super()._add_argument_hook(a)
-            @classmethod
-            def get_source(cls):
-                return cls.__bases__[0].get_source()
-                
-        register(cls, a)
-        return AllArgumentsDecorator
+        return register(cls, a)
     return inner
 
 
@@ -219,15 +200,7 @@ class InputDescription(IODescription):
 def input(ptype, desc=None):
     d = InputDescription(ptype, desc)
     def inner(cls):
-        class InputDecorator(cls):
-            def construct(self):
-                super()._set_input_description(d)
-            @classmethod
-            def get_source(cls):
-                return cls.__bases__[0].get_source()
-                
-        register(cls, d)
-        return InputDecorator
+        return register(cls, d)
     return inner
 
 class OutputDescription(IODescription):
@@ -236,27 +209,70 @@ class OutputDescription(IODescription):
 def output(ptype, desc=None):
     d = OutputDescription(ptype, desc)
     def inner(cls):
-        class OutputDecorator(cls):
-            def construct(self):
-                super()._set_output_description(d)
-            @classmethod
-            def get_source(cls):
-                return cls.__bases__[0].get_source()
-                
-        register(cls, d)
-        return OutputDecorator
+        return register(cls, d)
     return inner
 
 
+#An implementation of an operator for payloads known, when the flow is wired,
+#to be of the given type, eg `@specialise('str', split_str)`. For function
+#operators it takes the same arguments as the function, for operator classes
+#it replaces the `transform` method
+class Specialisation:
+    def __init__(self, ptype, function):
+        self._ptype = ptype
+        self._function = function
+    
+    @property
+    def ptype(self): return self._ptype
+    
+    @property
+    def function(self): return self._function
+
+def specialise(ptype, function):
+    d = Specialisation(ptype, function)
+    def inner(cls):
+        return register(cls, d)
+    return inner
+
+
+#Function components bind their args and params to the function once they
+#have been set up, so that each activation is a single call. The payload, if
+#any, is always the first argument, so args which follow it are bound by the
+#names of the parameters they fill. Where they cannot be (eg. `*args`), each
+#call still unpacks them after the payload into a new tuple and dict
+def bind(fn, args, params, payload=True):
+    import functools
+    if not payload or not args:
+        if not args and not params: return fn
+        return functools.partial(fn, *args, **params)
+    named = names(fn, len(args), params)
+    if named != None:
+        return functools.partial(fn, **dict(zip(named, args)), **params)
+    return lambda payload: fn(payload, *args, **params)
+
+#The names of the `count` parameters after the first, if each can be given
+#by name and is not also in params
+def names(fn, count, params):
+    import inspect
+    try:
+        parameters = list(inspect.signature(fn).parameters.values())[1:count + 1]
+    except (TypeError, ValueError):
+        return None
+    if len(parameters) < count: return None
+    if any(p.kind != p.POSITIONAL_OR_KEYWORD for p in parameters): return None
+    if any(p.name in params for p in parameters): return None
+    return [p.name for p in parameters]
+
 
 def source(fn):
     from actuator.components.source import Source
     class FunctionSource(Source):
+        def initialise(self, *args, **kwargs):
+            super().initialise(*args, **kwargs)
+            self._call = bind(fn, self.args.as_list, self.params.as_dict, payload=False)
         @property
         def value(self):
-            args = self.args.as_list
-            params = self.params.as_dict
-            return fn(*args, **params)
+            return self._call()
         @classmethod
         def get_source(cls):
             import inspect
@@ -273,10 +289,11 @@ def source(fn):
 def sink(fn):
     from actuator.components.sink import Sink
     class FunctionSink(Sink):
+        def initialise(self, *args, **kwargs):
+            super().initialise(*args, **kwargs)
+            self._call = bind(fn, self.args.as_list, self.params.as_dict)
         def perform(self, payload):
-            args = self.args.as_list
-            params = self.params.as_dict
-            return fn(payload, *args, **params)
+            return self._call(payload)
         @classmethod
         def get_source(cls):
             import inspect
@@ -293,11 +310,19 @@ def sink(fn):
 def operator(fn):
     from actuator.components.operator import Operator
     class FunctionOperator(Operator):
+        kernel = staticmethod(fn)
+        def initialise(self, *args, **kwargs):
+            super().initialise(*args, **kwargs)
+            function = self.specialisation.function if self.specialisation else fn
+            self._call = bind(function, self.args.as_list, self.params.as_dict)
+        def transform(self, payload):
+            return self._call(payload)
         @property
-        def value(self):
-            args = self.args.as_list
-            params = self.params.as_dict
-            return fn(self.upstream.value, *args, **params)
+        def transform_function(self):
+            return self._call
+        def transform_batch(self, payloads):
+            call = self._call
+            return [call(payload) for payload in payloads]
         @classmethod
         def get_source(cls):
             import inspect
@@ -309,3 +334,25 @@ def operator(fn):
             if docstring: docstring = inspect.cleandoc(docstring)
             return docstring
     return FunctionOperator
+
+
+
+import unittest
+class BindTests(unittest.TestCase):
+
+    def test_bind(self):
+        import functools
+        def fn(payload, sep, *rest, end=''):
+            return sep.join([payload] + list(rest)) + end
+        def plain(payload, sep, end=''):
+            return payload + sep + end
+        self.assertIs(bind(fn, [], {}), fn)
+        #Args after the payload are bound by name
+        bound = bind(plain, ['-'], {'end': '!'})
+        self.assertIsInstance(bound, functools.partial)
+        self.assertEqual(bound('a'), 'a-!')
+        #Not when they fill *args
+        bound = bind(fn, ['-', 'b'], {'end': '!'})
+        self.assertNotIsInstance(bound, functools.partial)
+        self.assertEqual(bound('a'), 'a-b!')
+        self.assertEqual(bind(lambda *a: a, ['x'], {}, payload=False)(), ('x',))
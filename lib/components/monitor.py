@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 
-import time, traceback
+import time, traceback, threading
 from actuator import log, util
 from actuator.components import component, source as mod_source, sink as mod_sink
 from actuator.components.decorators import parameter, argument, input, output, allarguments
@@ -42,11 +42,30 @@ class Monitor(component.Component):
     @property
     def operator(self): return self.context.operator
 
+    #The flow's engine produces payloads from the source and operators
+    @property
+    def engine(self): return self.context.engine
+
     @property
     def threaded(self):
         #In general, monitors require a thread to run their flow
         return True
 
+    #Monitors which can run as a coroutine implement `start_async`
+    @property
+    def asynchronous(self): return False
+
+    #Monitors which activate their flow once per `params.sleep` seconds 
+    #implement `tick`, and can have their activations scheduled elsewhere
+    @property
+    def periodic(self): return False
+
+    def tick(self):
+        raise Exception("Unimplemented for {}".format(self.kind))
+
+    async def start_async(self, runtime):
+        raise Exception("Unimplemented for {}".format(self.kind))
+
     def suggest_source(self):
         return None
     def suggest_sink(self):
@@ -63,6 +82,9 @@ class MonitorSleepMixin(component.Component):
         from threading import Event
         self._sleeper = Event()
         self._stopped = False
+        self._async_sleeper = None
+        self._loop = None
+        self._stop_callbacks = []
             
     def sleep(self):
         try:
@@ -73,10 +95,33 @@ class MonitorSleepMixin(component.Component):
             return False
         return not self._stopped
         
+    async def sleep_async(self):
+        import asyncio
+        if self._stopped: return False
+        if not self._async_sleeper:
+            self._loop = asyncio.get_running_loop()
+            self._async_sleeper = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._async_sleeper.wait(), self.params.sleep)
+        except asyncio.TimeoutError:
+            pass
+        return not self._stopped
         
+    @property
+    def stopped(self): return self._stopped
+        
+    #Calls `callback` once the monitor is stopped, for runtimes which sleep
+    #between activations on its behalf
+    def on_stop(self, callback):
+        self._stop_callbacks.append(callback)
+
     def stop_sleep(self):
         self._stopped = True
         self._sleeper.set()
+        for callback in self._stop_callbacks: callback()
+        #The asyncio event belongs to the loop, and stop may be called elsewhere
+        if self._async_sleeper:
+            self._loop.call_soon_threadsafe(self._async_sleeper.set)
     
 @parameter('exit_on_none', 'bool', True, 'Exit if the monitor receives a None value from its source')
 @parameter('exit_on_false', 'bool', False, 'Exit if the monitor receives a False value from its source')
@@ -93,7 +138,7 @@ class ExitOnValueMixin(component.Component):
 class OnceMonitor(Monitor):
     def start(self):
         try:
-            self.sink.perform(self.operator.value)
+            self.sink.perform(self.engine.value)
         except:
             raise
     def stop(self):
@@ -109,7 +154,7 @@ class CountMonitor(Monitor):
         for i in range(0, self._count):
             try:
                 if self._terminate: return
-                self.sink.perform(self.operator.value)
+                self.sink.perform(self.engine.value)
             except:
                 self.logger.error(traceback.format_exc())
                 
@@ -117,109 +162,141 @@ class CountMonitor(Monitor):
         self._terminate = True
 
 
-#Runs until terminated
+#Runs until terminated. In batch mode, runs up to `batch` inputs through
+#the flow at once, and exits once the input has ended
+@parameter('batch', 'int', 1, 'Maximum number of inputs to process at once')
+@parameter('linger', 'int', 0, 'Milliseconds to wait for a batch to fill once input has arrived')
 class OnInputMonitor(Monitor):
     def initialise(self, *args, **kwargs):
         self._terminate = False
     def start(self):
+        if self.params.batch > 1: return self.start_batched()
         while True:
             try:
                 if self._terminate: return
-                self.sink.perform(self.operator.value)
+                value = self.engine.value
+                #A source stopped while waiting for input has nothing to pass on
+                if self._terminate: return
+                self.sink.perform(value)
+            except:
+                self.logger.error(traceback.format_exc())
+    def start_batched(self):
+        size = self.params.batch
+        linger = self.params.linger / 1000.0
+        while True:
+            try:
+                if self._terminate: return
+                payloads = self.engine.batch(size, linger)
+                if not payloads: return
+                self.sink.perform_batch(payloads)
             except:
                 self.logger.error(traceback.format_exc())
     def stop(self):
         self._terminate = True
 
 
-#The interval monitor runs repeatedly with a delay, optionally exiting on a 
-#None or, also optionally, False
-class IntervalMonitor(Monitor, MonitorSleepMixin, ExitOnValueMixin):
+#Base for monitors which activate their flow repeatedly, sleeping in between. 
+#Each activation is performed by `tick`, which returns False once the monitor
+#should exit. This allows the monitor to be run either by its own thread, as
+#a coroutine on a shared event loop by the asyncio runtime, or by the shared
+#scheduler of the scheduled runtime.
+class PeriodicMonitor(Monitor, MonitorSleepMixin):
     def start(self):
+        self.logger.info("Starting with source %s and sink %s", self.operator, self.sink)
         while True:
             try:
-                #Get the value from the source
-                value = self.operator.value
-                            
-                #if we exit on an exit condition value, and this is one, return
-                if self.value_is_exit_condition(value):
-                    return
-                
-                #Pass the value to the sink
-                self.sink.perform(value)
+                if not self.tick(): return
             except:
                 self.logger.error(traceback.format_exc())
             
             #sleep for the specified interval
             if not self.sleep(): return
 
-    def stop(self):
-        self.stop_sleep()
-
-
-#Monitors the result of a Source over time, triggering an event (callback) 
-#when the value changes, passing the new state as the single argument.
-class ChangeMonitor(Monitor, MonitorSleepMixin):
-    def start(self):
-        self.logger.info("Starting with source %s and sink %s", self.operator, self.sink)
-        last_state = None
-        new_state = None
+    #Activations may block, so they are handed to the runtime's executor
+    #while the sleeps between them are done on the event loop
+    async def start_async(self, runtime):
+        self.logger.info("Starting asynchronously with source %s and sink %s", self.operator, self.sink)
         while True:
             try:
-                new_state = self.operator.value
-                if new_state != last_state:
-                    self.logger.info("State '%s' (%s), running sink", util.short_string(new_state), "changed" if new_state != last_state else "unchanged")
-                    self.sink.perform(new_state)
-                    last_state = new_state
+                if not await runtime.run(self.tick): return
             except:
                 self.logger.error(traceback.format_exc())
-                
-            if not self.sleep(): return
             
+            if not await self.sleep_async(): return
+
+    @property
+    def asynchronous(self): return True
+
+    @property
+    def periodic(self): return True
+
     def stop(self):
         self.stop_sleep()
 
 
+#The interval monitor runs repeatedly with a delay, optionally exiting on a 
+#None or, also optionally, False
+class IntervalMonitor(PeriodicMonitor, ExitOnValueMixin):
+    def tick(self):
+        #Get the value from the source
+        value = self.engine.value
+                    
+        #if we exit on an exit condition value, and this is one, return
+        if self.value_is_exit_condition(value):
+            return False
+        
+        #Pass the value to the sink
+        self.sink.perform(value)
+        return True
+
+
+#Monitors the result of a Source over time, triggering an event (callback) 
+#when the value changes, passing the new state as the single argument.
+class ChangeMonitor(PeriodicMonitor):
+    def construct(self):
+        self._last_state = None
+
+    def tick(self):
+        new_state = self.engine.value
+        #Sources which know they are unchanged emit the same payload again,
+        #which is cheaper to recognise than comparing it
+        if new_state is self._last_state: return True
+        if new_state != self._last_state:
+            self.logger.info("State '%s' (%s), running sink", util.short_string(new_state), "changed")
+            self.sink.perform(new_state)
+            self._last_state = new_state
+        return True
+
+
 #Monitors the result of a Source over time, triggering an event (callback) 
 #when the value matches (or changes to match) a given value. Passes the 
 #matched state as the single argument.
 @argument('value', 'any', None, 'Value for comparison')
 @parameter('always', 'bool', False, 'Only fire on a state change')
-class OnValueMonitor(Monitor, MonitorSleepMixin):
-    def start(self):
-        self.logger.info("Starting with source %s and sink %s", self.operator, self.sink)
-        last_state = None
-        new_state = None
-        while True:
-            try:
-                changed = new_state != last_state
-                new_state = self.operator.value
-                if new_state == self.args.value and (changed or self.params.always):
-                    self.logger.info("State '%s' (%s), running sink", util.short_string(new_state), "changed" if new_state != last_state else "unchanged")
-                    self.sink.perform(new_state)
-                    last_state = new_state
-            except:
-                self.logger.error(traceback.format_exc())
-                
-            if not self.sleep(): return
-            
-    def stop(self):
-        self.stop_sleep()
+class OnValueMonitor(PeriodicMonitor):
+    def construct(self):
+        self._last_state = None
+        self._new_state = None
+
+    def tick(self):
+        changed = self._new_state != self._last_state
+        self._new_state = self.engine.value
+        if self._new_state == self.args.value and (changed or self.params.always):
+            self.logger.info("State '%s' (%s), running sink", util.short_string(self._new_state), "changed" if self._new_state != self._last_state else "unchanged")
+            self.sink.perform(self._new_state)
+            self._last_state = self._new_state
+        return True
 
 
 
 #NOTE: This monitor is never created through the expression explicitly. Instead
 #this monitor can be returned by a sink when no monitor is specified, effectively
 #allowing the sink to override the default, not the user
-class OnDemandMonitor(Monitor, MonitorSleepMixin):
-    def start(self):
-        #Block the monitor thread so long as there are sinks showing as active
-        while self.active_sinks:
-            if not self.sleep(): break
-        #Done, sleep has been interrupted or all sinks are inactive
-        
-    def stop(self):
-        self.stop_sleep()
+class OnDemandMonitor(PeriodicMonitor):
+    #Block the monitor so long as there are sinks showing as active. Once
+    #done, sleep has been interrupted or all sinks are inactive
+    def tick(self):
+        return len(self.active_sinks) > 0
         
     def demand(self):
         #Unlike most monitors, this monitor serves requests from elsewhere. This
@@ -228,7 +305,7 @@ class OnDemandMonitor(Monitor, MonitorSleepMixin):
         #we're started
         self.context.startup_wait()
         try:
-            return self.operator.value
+            return self.engine.value
         except:
             self.logger.error(traceback.format_exc())
     
@@ -239,15 +316,17 @@ class OnDemandMonitor(Monitor, MonitorSleepMixin):
     
 class OnCallMonitor(Monitor):
 
+    #Each calling thread sees only the payload it passed in, so a callable flow
+    #may be called from several threads at once
     class OnCallSource(mod_source.Source):
         def construct(self):
-            self._value = None
+            self._local = threading.local()
 
         @property
         def value(self):
-            return self._value
+            return getattr(self._local, 'value', None)
 
-        def set_value(self, value): self._value = value
+        def set_value(self, value): self._local.value = value
 
     class OnCallSink(mod_sink.Sink):
         pass
@@ -268,7 +347,7 @@ class OnCallMonitor(Monitor):
     def call(self, payload):
         try:
             self.source.set_value(payload)
-            result = self.operator.value
+            result = self.engine.value
             self.source.set_value(None)
             return result
         except:
@@ -279,3 +358,29 @@ class OnCallMonitor(Monitor):
 
     def suggest_sink(self):
         return OnCallMonitor.OnCallSink()
+
+
+
+import unittest
+class MonitorTests(unittest.TestCase):
+
+    #The same payload again is recognised without being compared
+    def test_change_identity(self):
+        import types
+        class Payload:
+            compared = 0
+            def __eq__(self, other):
+                Payload.compared += 1
+                return self is other
+            def __ne__(self, other):
+                return not self == other
+        payload = Payload()
+        performed = []
+        monitor = ChangeMonitor()
+        monitor.set_context(types.SimpleNamespace(name="test",
+            engine=types.SimpleNamespace(value=payload),
+            sink=types.SimpleNamespace(perform=performed.append)))
+        for _ in range(3):
+            self.assertTrue(monitor.tick())
+        self.assertEqual(performed, [payload])
+        self.assertEqual(Payload.compared, 1)
@@ -1,6 +1,7 @@
+import time, threading
 from actuator import util
 from actuator.components import component
-from actuator.components.decorators import parameter, argument, input, output, allarguments, operator
+from actuator.components.decorators import parameter, argument, input, output, allarguments, operator, specialise
 
 ROLE_OPERATOR = "operator"
 
@@ -48,10 +49,76 @@ class Operator(component.Component):
         if self.upstream == None: return [self]
         return self.upstream.upstreams + [self]
     
+    #Operators which compute their payload purely from their upstream's
+    #payload implement `transform` rather than `value`. This allows an engine
+    #to push payloads through them without walking the chain of upstreams
+    def transform(self, payload):
+        raise Exception("Unimplemented for {}".format(self.kind))
+    
+    @property
+    def pushable(self):
+        return type(self).transform is not Operator.transform
+    
+    #Operators whose transform is just a call to a plain function of the 
+    #payload, args and params may provide that function as their kernel, 
+    #which allows it to be run in another process
+    kernel = None
+    
+    #Pure operators compute their payload from nothing but the payload and
+    #their args and params, without side effects, so the optimizer may run
+    #them ahead of time or fuse them with their neighbours. Operators with a
+    #kernel are pure
+    @property
+    def pure(self): return self.kernel != None
+    
+    #Chooses an implementation registered with @specialise for payloads of
+    #the given type, if there is one. Called before setup, by the type check
+    #done when flows are wired
+    def specialise(self, ptype):
+        from actuator.components.decorators import hooks
+        from actuator.flows import typecheck
+        for s in hooks(type(self)).specialisations:
+            if not typecheck.specialises(s.ptype, ptype): continue
+            self._specialisation = s
+            if self.kernel == None:
+                import types
+                self.transform = types.MethodType(s.function, self)
+            return True
+        return False
+    
+    @property
+    def specialisation(self): return getattr(self, '_specialisation', None)
+    
+    #The transform as a single callable of the payload, once set up
+    @property
+    def transform_function(self): return self.transform
+    
+    #Pushable operators may override this to transform a batch of payloads
+    #more efficiently than one `transform` call per payload
+    def transform_batch(self, payloads):
+        return [self.transform(payload) for payload in payloads]
+    
     #return a boolean
     @property
     def value(self):
-        raise Exception("Unimplemented for {}".format(self.kind))
+        return self.transform(self.upstream.value)
+    
+    #Returns a list of up to `size` payloads, waiting up to `linger` seconds
+    #for more to become available. Operators which are not pushable pull
+    #their payloads one at a time, until a None shows that the input has
+    #ended. Each pull may block, so a `linger` is only checked between them,
+    #and without one the batch is filled
+    def batch(self, size, linger=0):
+        if self.pushable: return self.transform_batch(self.upstream.batch(size, linger))
+        payloads = []
+        deadline = None
+        while len(payloads) < size:
+            if deadline != None and time.time() > deadline: break
+            value = self.value
+            if value == None: break
+            payloads.append(value)
+            if deadline == None and linger > 0: deadline = time.time() + linger
+        return payloads
         
     @property
     def description_data(self):
@@ -73,14 +140,13 @@ def noop(payload):
 @input('any', 'Accepts any input payload')
 @output('any', 'Emits the given payload without modification')
 @argument('value', 'any', None, 'Value for comparison')
-@operator
 class Equals(Operator):
-    @property
-    def value(self):
-        """
-        Compares the payload to a given value and emits the result
-        """
-        value = self.upstream.value
+    """
+    Compares the payload to a given value and emits the result
+    """
+    pure = True
+
+    def transform(self, value):
         compare = self.args.value
         if isinstance(compare, (list, tuple)):
             return value in compare
@@ -94,9 +160,9 @@ class Not(Operator):
     """
     The boolean 'not' operator
     """
-    @property
-    def value(self):
-        value = self.upstream.value
+    pure = True
+
+    def transform(self, value):
         return not value
 
 @input('any')
@@ -105,9 +171,10 @@ class Str(Operator):
     """
     Convert payload to string
     """
-    @property
-    def value(self):
-        return str(self.upstream.value)
+    pure = True
+
+    def transform(self, value):
+        return str(value)
 
 @input('any')
 @output('int')
@@ -115,9 +182,10 @@ class Int(Operator):
     """
     Convert payload to integer
     """
-    @property
-    def value(self):
-        return int(self.upstream.value)
+    pure = True
+
+    def transform(self, value):
+        return int(value)
 
 @input('any')
 @output('real')
@@ -125,9 +193,10 @@ class Real(Operator):
     """
     Convert payload to real
     """
-    @property
-    def value(self):
-        return float(self.upstream.value)
+    pure = True
+
+    def transform(self, value):
+        return float(value)
 
 @input('any', 'Object or data structure')
 @output('any', 'Value accessed from within object or data structure')
@@ -152,14 +221,18 @@ class Get(Operator):
           
 
     """
+    pure = True
+
     def initialise(self, *args, **kwargs):
         from actuator.lang.accessor import accessor
         self._access_function = accessor(self.args.accessor)
         
-    @property
-    def value(self):
-        value = self.upstream.value
+    def transform(self, value):
         return self._access_function(value)
+    
+    def transform_batch(self, payloads):
+        access = self._access_function
+        return [access(value) for value in payloads]
         
 
 @input('any', 'Object or data structure')
@@ -169,9 +242,9 @@ class Has(Operator):
     """
     Given a list of keys, emit True if any of them are contained within the payload
     """       
-    @property
-    def value(self):
-        value = self.upstream.value
+    pure = True
+
+    def transform(self, value):
         return any([key in value for key in self.args.keys])
 
 @input('list', 'Elements to evaluate')
@@ -180,9 +253,9 @@ class All(Operator):
     """
     Given a list or iterable, emit True if all elements evaluate to True or truthy
     """            
-    @property
-    def value(self):
-        value = self.upstream.value
+    pure = True
+
+    def transform(self, value):
         return all(value)
 
 
@@ -192,12 +265,66 @@ class Any(Operator):
     """
     Given a list or iterable, emit True if any elements evaluate to True or truthy
     """ 
-    @property
-    def value(self):
-        value = self.upstream.value
+    pure = True
+
+    def transform(self, value):
         return any(value)
 
 
+#Runs a chain of pure operators as one, with a single call per payload to
+#a function composed of their transforms. Built by the optimizer
+class FusedOperator(Operator):
+    def __init__(self, operators):
+        super().__init__()
+        self._operators = list(operators)
+        self._function = None
+    
+    @property
+    def operators(self): return list(self._operators)
+    
+    @property
+    def pure(self): return True
+    
+    def set_context(self, context):
+        super().set_context(context)
+        for o in self._operators: o.set_context(context)
+    
+    def setup(self):
+        super().setup()
+        for o in self._operators: o.setup()
+        functions = tuple(o.transform_function for o in self._operators)
+        def fused(payload):
+            for function in functions:
+                payload = function(payload)
+            return payload
+        self._function = fused
+    
+    def start(self):
+        for o in self._operators: o.start()
+    
+    def stop(self):
+        for o in self._operators: o.stop()
+    
+    @property
+    def transform_function(self): return self._function
+    
+    def transform(self, payload):
+        return self._function(payload)
+    
+    def transform_batch(self, payloads):
+        function = self._function
+        return [function(payload) for payload in payloads]
+    
+    def __str__(self):
+        return "fused({})".format(" | ".join(o.name or o.kind for o in self._operators))
+    
+    @property
+    def description_data(self):
+        d = super().description_data
+        d[self.kind]["fused-operators"] = [o.description_data for o in self._operators]
+        return d
+
+
 class SinkOperator(Operator):
     def __init__(self, sink):
         super().__init__()
@@ -210,9 +337,11 @@ class SinkOperator(Operator):
     @property
     def sink(self): return self._sink
     
-    @property
-    def value(self):
-        value = self.upstream.value
+    #When frozen, the payload continuing down the chain is the same one the
+    #sink was given
+    def transform(self, value):
+        from actuator import frozen
+        value = frozen.freeze_for(self.context, value)
         self._sink.perform(value)
         return value
 
@@ -247,20 +376,54 @@ class SubFlow(Operator):
         if not isinstance(self.subflow.monitor, mod_monitor.OnCallMonitor):
             raise Exception("Given flow {} is not callable".format(self.subflow.kind))
 
-    @property
-    def value(self):
-        return self.subflow.monitor.call(self.upstream.value)
+    def transform(self, value):
+        return self.subflow.monitor.call(value)
 
 
+#Calls the subflow once for each element of a list. With more than one
+#worker, elements are handed to a pool of threads so that slow subflows (eg.
+#shell commands or URLs) overlap, and the results are kept in order
+@parameter('workers', 'int', 1, 'Number of elements to call the subflow with at once')
 class MapFlow(SubFlow):
-    @property
-    def value(self):
-        return [self.subflow.monitor.call(v) for v in self.upstream.value]
+    def construct(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
-class FilterFlow(SubFlow):
     @property
-    def value(self):
-        return [v for v in self.upstream.value if self.subflow.monitor.call(v)]
+    def executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with self._executor_lock:
+            if self._executor == None:
+                self._executor = ThreadPoolExecutor(max_workers=self.params.workers, thread_name_prefix='actuator-map')
+            return self._executor
+
+    #Payloads may be any iterable, including generators which can only be
+    #read once and have no length
+    def elements(self, value):
+        if isinstance(value, (list, tuple)): return value
+        return list(value)
+
+    def call_each(self, value):
+        call = self.subflow.monitor.call
+        value = self.elements(value)
+        if self.params.workers <= 1 or len(value) <= 1:
+            return [call(v) for v in value]
+        return list(self.executor.map(call, value))
+
+    def transform(self, value):
+        return self.call_each(value)
+
+    def stop(self):
+        super().stop()
+        with self._executor_lock:
+            if self._executor != None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+class FilterFlow(MapFlow):
+    def transform(self, value):
+        value = self.elements(value)
+        return [v for v, keep in zip(value, self.call_each(value)) if keep]
 
     
 
@@ -314,14 +477,18 @@ class Change(Operator):
     def construct(self):
         self._state = None
 
-    @property
-    def value(self):
+    def transform(self, new_state):
         old_state = self._state
-        new_state = self.upstream.value
         change = not (old_state == new_state)
         self._state = new_state
         return change
 
+#Sources declaring str still emit None when they have nothing
+def split_str(payload, delim):
+    if payload is None: return None
+    return payload.split(delim)
+
+@specialise('str', split_str)
 @input('any', 'String to be split, converted to string if other')
 @output('list[str]', 'List of split string segments')
 @argument('delim', 'str', '\n', 'Delimiter by which to split the payload')
@@ -356,3 +523,26 @@ def do_hash(payload):
     
 
 
+
+import unittest
+class OperatorTests(unittest.TestCase):
+
+    def source(self, values):
+        from actuator.components.source import Source
+        class ListSource(Source):
+            @property
+            def value(self):
+                return values.pop(0) if values else None
+        return ListSource()
+
+    #Not pushable, so each payload in a batch is pulled
+    def test_batch_pulled(self):
+        o = Try()
+        o.set_upstream(self.source(['a', 'b', 'c']))
+        self.assertEqual(o.batch(2), ['a', 'b'])
+        self.assertEqual(o.batch(2), ['c'])
+        self.assertEqual(o.batch(2), [])
+        o = Once()
+        o.set_upstream(self.source(['a', 'b']))
+        self.assertEqual(o.batch(2), ['a'])
+        self.assertEqual(o.batch(2), [])
@@ -2,6 +2,8 @@
 
 from actuator import log, util
 from actuator.components import component
+from actuator.components.decorators import parameter
+import threading
 
 
 ROLE_SINK = "sink"
@@ -23,6 +25,10 @@ def build(instruction, kwargs):
 class Sink(component.Component):
     def perform(self, payload):
         raise Exception("Unimplemented for {}".format(self.kind))
+    
+    def perform_batch(self, payloads):
+        for payload in payloads:
+            self.perform(payload)
        
     @property
     def active(self):
@@ -78,12 +84,87 @@ class RunnerSink(Sink):
         raise Exception("Unimplemented for {}".format(self.kind))
 
 
+#A bounded buffer between a FlowSink and the FlowSource of its target flow.
+#When full, the `block` policy makes the producer wait for the consumer,
+#while `drop_oldest` and `drop_newest` discard a payload and count it
+class LinkQueue:
+    POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+    def __init__(self, size, policy='block'):
+        import collections
+        if not policy in LinkQueue.POLICIES:
+            raise Exception("Unknown queue policy '{}', expected one of {}".format(policy, ", ".join(LinkQueue.POLICIES)))
+        self._size = size
+        self._policy = policy
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._dropped = 0
+        self._total = 0
+
+    @property
+    def size(self): return self._size
+
+    @property
+    def policy(self): return self._policy
+
+    @property
+    def depth(self):
+        with self._condition: return len(self._items)
+
+    @property
+    def dropped(self): return self._dropped
+
+    @property
+    def closed(self): return self._closed
+
+    def put(self, payload):
+        with self._condition:
+            while len(self._items) >= self.size and self.policy == 'block' and not self._closed:
+                self._condition.wait()
+            if self._closed: return
+            self._total += 1
+            if len(self._items) >= self.size:
+                self._dropped += 1
+                if self.policy == 'drop_newest': return
+                self._items.popleft()
+            self._items.append(payload)
+            self._condition.notify_all()
+
+    #Blocks until a payload is available. Once closed, any payloads still
+    #queued are returned before None
+    def get(self):
+        with self._condition:
+            while not self._items and not self._closed:
+                self._condition.wait()
+            if not self._items: return None
+            payload = self._items.popleft()
+            self._condition.notify_all()
+            return payload
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def description_data(self):
+        with self._condition:
+            return {"size": self.size, "policy": self.policy, "depth": len(self._items), "dropped": self._dropped, "total": self._total}
+
+
+@parameter('queue', 'int', 0, 'Buffer up to this many payloads for the target flow instead of only the latest')
+@parameter('policy', 'str', 'block', 'When the queue is full, either block, drop_oldest or drop_newest')
 class FlowSink(Sink, OnDemandMixin):
     #Stash the target name early, so that once the context is set
     #we'll have everything we need to wire flows together
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._target_ref = args[0]
+        #The monitor is chosen before parameters are processed, and a queued
+        #link is filled by its own flow's monitor rather than on demand
+        self._queued = int(kwargs.get('queue', 0)) > 0
+        self._queue = None
            
     #Once the context is set, we have everything we need to look up
     #The target flow. This allows us to wire earlier
@@ -93,10 +174,10 @@ class FlowSink(Sink, OnDemandMixin):
         flowset = flow.context
         self._target = self._target_ref.dereference(flowset)
         
-    #Everything has already been done by __init__ and set_context
     def initialise(self, *args, **kwargs):
         super().initialise(*args, **kwargs)
-        
+        if self.params.queue > 0:
+            self._queue = LinkQueue(self.params.queue, self.params.policy)
     
     #This sink is active as long as it's target flow is running
     @property
@@ -109,12 +190,36 @@ class FlowSink(Sink, OnDemandMixin):
     
     @property
     def target(self): return self._target
+
+    @property
+    def queue(self): return self._queue
     
     def suggest_monitor(self):
+        if self._queued: return None
         return self.ondemand_monitor
     
     def perform(self, payload):
-        self.set_payload(payload)
+        from actuator import frozen
+        payload = frozen.freeze_for(self.context, payload)
+        if self.queue:
+            self.queue.put(payload)
+        else:
+            self.set_payload(payload)
+
+    def get_payload(self):
+        if self.queue:
+            return self.queue.get()
+        return super().get_payload()
+
+    #Let the target flow drain what is left once this flow is done
+    def stop(self):
+        super().stop()
+        if self.queue: self.queue.close()
+
+    #Called when the target flow stops. Once it has stopped, nothing will
+    #take payloads from the queue, so this flow must not wait for room in it
+    def release(self):
+        if self.queue: self.queue.close()
 
     @property
     def description_data(self):
@@ -123,13 +228,11 @@ class FlowSink(Sink, OnDemandMixin):
             d[self.kind]["flowsink-target"] = {"name": self.target.name, "kind": self.target.kind}
         elif self.target_name:
             d[self.kind]["flowsink-targetname"] = self.target.name
+        if self.queue:
+            d[self.kind]["flowsink-queue"] = self.queue.description_data
         return d
-        
-        
-
 
 
-import threading
 class DedicatedThreadSink(Sink):
     def initialise(self, *args, **kwargs):
         super().initialise(*args, **kwargs)
@@ -188,3 +291,43 @@ class NoneSink(Sink):
 
         
 
+
+
+
+import unittest
+class LinkTests(unittest.TestCase):
+
+    def flowset(self, expression):
+        from actuator.lang import parser
+        flowset = parser.parse_flowset(expression)
+        flowset.setup()
+        flowset.start()
+        flowset.startup_wait()
+        return flowset
+
+    #A flow reading links is not held up by one which has sent nothing
+    def test_unsent(self):
+        flowset = self.flowset("flow t from 'tick' to @c on start; flow n from none to @c on change(sleep=60); flow c from inflows to $out on interval(sleep=0.01)")
+        import time
+        c = flowset.flows[2]
+        out = lambda: c.scope.get_local('out') if c.scope.has_local('out') else None
+        deadline = time.time() + 5
+        while out() != ['tick', None] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(out(), ['tick', None])
+        flowset.remove(flowset.flows, timeout=5)
+
+    #A flow sending to a full queue is not left waiting for room once the
+    #flow reading the queue has stopped
+    def test_release_queue(self):
+        flowset = self.flowset("flow p from '1' to @c(queue=1, policy='block') on interval(sleep=0); flow c from inflows to $out on interval(sleep=60)")
+        p, c = flowset.flows
+        queue = p.outflows[0].queue
+        flowset.remove([c], timeout=5)
+        self.assertTrue(queue.closed)
+        put = threading.Thread(target=lambda: queue.put('2'), daemon=True)
+        put.start()
+        put.join(5)
+        self.assertFalse(put.is_alive())
+        flowset.remove([p], timeout=5)
+        self.assertFalse(p._thread.is_alive())
@@ -1,4 +1,4 @@
-import time
+import time, threading
 import subprocess
 from actuator import log, util
 from actuator.components import operator
@@ -17,6 +17,7 @@ def instructions():
         'value': ValueSource,
         'inflows': FlowSource,
         'none': NoneSource,
+        'scheduler': SchedulerSource,
     }
 
 def build(instruction, kwargs):
@@ -31,11 +32,30 @@ class Source(operator.Operator):
     def wire(self, inflows):
         pass
 
+    #Constant sources emit the same payload every time, and nothing else, so
+    #the optimizer may evaluate them (and any pure operators after them) once
+    constant = False
+
+    #Flows polling identical shareable sources on the same interval may share
+    #a single activation of them each period. Sources whose payload depends on
+    #the flow reading them, or on how many times they have been read, are not
+    shareable = True
+
     #return a boolean
     @property
     def value(self):
         raise Exception("Unimplemented for {}".format(self.kind))
     
+    #Sources which can produce several payloads at once (eg. lines of input)
+    #should override this. An empty batch indicates that the source has ended
+    def batch(self, size, linger=0):
+        return [self.value]
+    
+    #Sources which produce payloads as they arrive, rather than when polled,
+    #may provide the monitor which suits them for flows which do not name one
+    def suggest_monitor(self):
+        return None
+    
     #Identifies this component as part of a flow
     @property
     def role(self): return ROLE_SOURCE
@@ -71,6 +91,8 @@ class DelegatingSource(Source):
 
 
 class FlowSource(Source):
+    shareable = False
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._inflows = []
@@ -87,6 +109,9 @@ class FlowSource(Source):
     def inflows(self):
         return self._inflows
     
+    def stop(self):
+        for inflow in self.inflows: inflow.release()
+    
     @property
     def value(self):
         #no inflows, return None
@@ -111,6 +136,8 @@ class ValueSource(Source):
     """
     Emits the given value
     """        
+    constant = True
+
     @property
     def value(self):
         return self.args.value
@@ -121,6 +148,8 @@ class StringSource(Source):
     """
     Emits the given value, coerced to a string 
     """        
+    constant = True
+
     @property
     def value(self):
         return str(self.args.value)
@@ -132,6 +161,8 @@ class IntegerSource(Source):
     """
     Emits the given value, coerced to an integer
     """        
+    constant = True
+
     @property
     def value(self):
         return int(self.args.value)
@@ -142,6 +173,8 @@ class RealSource(Source):
     """
     Emits the given value, coerced to a real (float)
     """
+    constant = True
+
     @property
     def value(self):
         return float(self.args.value)
@@ -152,6 +185,8 @@ class BooleanSource(Source):
     """
     Emits the given value, coerced to a boolean
     """
+    constant = True
+
     @property
     def value(self):
         return util.parse_bool(self.args.value)
@@ -165,6 +200,8 @@ class CounterSource(Source):
     """
     Emits a number, incrementing the value each time it fires.
     """
+    shareable = False
+
     def initialise(self, *args, **kwargs):
         self._counter = self.params.start
         
@@ -179,7 +216,164 @@ class NoneSource(Source):
     """
     Emits None (null)
     """
+    constant = True
+
     @property
     def value(self):
         return None
 
+
+
+#Emits a payload worked out ahead of time by the optimizer, from a constant
+#source and the pure operators which followed it. Mutable payloads are copied
+#for each activation, so a consumer which modifies its payload in place
+#cannot change what is emitted next time
+class ConstantSource(Source):
+    shareable = False
+
+    def __init__(self, value, folded):
+        super().__init__()
+        self._constant = value
+        self._folded = list(folded)
+    
+    @property
+    def folded(self): return list(self._folded)
+    
+    @property
+    def value(self):
+        from actuator import frozen
+        return frozen.unshared(self._constant)
+    
+    def __str__(self):
+        return "constant({!r} from {})".format(self._constant, " | ".join(c.name or c.kind for c in self._folded))
+    
+    @property
+    def description_data(self):
+        d = super().description_data
+        d[self.kind]["constant-value"] = self._constant
+        d[self.kind]["constant-folded"] = [c.description_data for c in self._folded]
+        return d
+
+
+#A source and the pure operators after it, shared by several flows which poll
+#them on the same interval. They are activated at most once per `window`
+#seconds, and every flow activated within the window is given a copy of the
+#same payload. A flow activated while the chain is running waits for its
+#payload rather than running it again. The components belong to the first
+#flow, and are set up and started with whichever flow gets there first
+class SharedChain:
+    def __init__(self, source, operators, window):
+        self._source = source
+        self._operators = list(operators)
+        self._window = window
+        self._lock = threading.Lock()
+        self._function = None
+        self._at = None
+        self._payload = None
+        self._started = 0
+    
+    @property
+    def source(self): return self._source
+    
+    @property
+    def operators(self): return list(self._operators)
+    
+    @property
+    def components(self): return [self._source] + self._operators
+    
+    def setup(self):
+        with self._lock:
+            if self._function != None: return
+            for c in self.components: c.setup()
+            source = self._source
+            functions = tuple(o.transform_function for o in self._operators)
+            def run():
+                payload = source.value
+                for function in functions:
+                    payload = function(payload)
+                return payload
+            self._function = run
+    
+    def start(self):
+        with self._lock:
+            self._started += 1
+            if self._started > 1: return
+        for c in self.components: c.start()
+    
+    #The components are stopped along with the last flow sharing them
+    def stop(self):
+        with self._lock:
+            self._started -= 1
+            if self._started > 0: return
+        for c in self.components: c.stop()
+    
+    @property
+    def value(self):
+        from actuator import frozen
+        with self._lock:
+            now = time.monotonic()
+            if self._at == None or now - self._at >= self._window:
+                self._payload = self._function()
+                self._at = time.monotonic()
+            return frozen.unshared(self._payload)
+
+
+class SharedSource(Source):
+    shareable = False
+
+    def __init__(self, shared, flows):
+        super().__init__()
+        self._shared = shared
+        self._flows = list(flows)
+        self._started = False
+    
+    @property
+    def shared(self): return self._shared
+    
+    #The names of all flows sharing the chain
+    @property
+    def flows(self): return list(self._flows)
+    
+    def setup(self):
+        super().setup()
+        self._shared.setup()
+    
+    #A flow may start and stop its source more than once
+    def start(self):
+        if self._started: return
+        self._started = True
+        self._shared.start()
+    
+    def stop(self):
+        if not self._started: return
+        self._started = False
+        self._shared.stop()
+    
+    @property
+    def value(self):
+        return self._shared.value
+    
+    def __str__(self):
+        return "shared({})".format(" | ".join(c.name or c.kind for c in self._shared.components))
+    
+    @property
+    def description_data(self):
+        d = super().description_data
+        d[self.kind]["shared-chain"] = [c.description_data for c in self._shared.components]
+        d[self.kind]["shared-by"] = self.flows
+        return d
+
+
+@output('dict', 'Metrics for the scheduled runtime')
+class SchedulerSource(Source):
+    """
+    Emits metrics for the scheduled runtime, including the lag in seconds
+    between when activations were due and when they began running. Emits 
+    None if no flows are using the scheduled runtime.
+    """
+    @property
+    def value(self):
+        from actuator.flows import runtime
+        scheduler = runtime.existing('scheduled')
+        if not scheduler: return None
+        return scheduler.metrics
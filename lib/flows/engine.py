@@ -0,0 +1,98 @@
+def instructions():
+    return {
+        'pull': PullEngine,
+        'compiled': CompiledEngine,
+    }
+
+#Builds the engine selected for this flow, either by the flow's own options
+#or globally from the command line
+def build(flow):
+    #Offloading stages to worker processes is done by the compiled engine
+    default = 'compiled' if flow.option('processes') else 'pull'
+    name = flow.option('engine', default)
+    if not name in instructions():
+        raise Exception("Unknown engine '{}' for flow {}".format(name, flow.name))
+    return instructions()[name](flow)
+
+
+#An engine is responsible for producing a payload from a wired flow's source
+#and operator chain each time the flow's monitor activates it
+class Engine:
+    def __init__(self, flow):
+        self._flow = flow
+
+    @property
+    def flow(self): return self._flow
+
+    @property
+    def value(self):
+        raise Exception("Unimplemented for {}".format(self.kind))
+
+    #Produces up to `size` payloads at once, see Operator.batch
+    def batch(self, size, linger=0):
+        raise Exception("Unimplemented for {}".format(self.kind))
+
+    @property
+    def kind(self):
+        return type(self).__name__
+
+    @property
+    def description(self):
+        return self.kind
+
+
+#The original engine, which pulls each payload backwards through the chain
+#of nested Operator.value properties
+class PullEngine(Engine):
+    def __init__(self, flow):
+        super().__init__(flow)
+        if flow.option('processes'):
+            flow.logger.warn("The pull engine cannot offload operators to other processes")
+
+    @property
+    def value(self):
+        return self.flow.operator.value
+
+    def batch(self, size, linger=0):
+        return self.flow.operator.batch(size, linger)
+
+
+#Flattens the chain at wire time into a list of bound transform methods which
+#are run in a simple loop. Operators which are not pushable (eg. `once` or
+#`lst.feed`, which decide for themselves when to pull) stay at the head of the
+#chain, and everything after the last of them is pushed. With the `processes`
+#option, pushed operators with kernels are run in a pool of worker processes
+class CompiledEngine(Engine):
+    def __init__(self, flow):
+        super().__init__(flow)
+        chain = flow.operator.upstreams
+
+        head = 0
+        for index, component in enumerate(chain):
+            if not component.pushable: head = index
+
+        self._head = chain[head]
+        self._operators = chain[head+1:]
+        processes = flow.option('processes')
+        if processes:
+            from actuator.flows import offload
+            self._operators = offload.group(self._operators, int(processes))
+        self._stages = [c.transform for c in self._operators]
+        flow.logger.debug("Compiled %s into %s pushed stage(s) after %s", flow.name, len(self._stages), self._head)
+
+    @property
+    def value(self):
+        payload = self._head.value
+        for stage in self._stages:
+            payload = stage(payload)
+        return payload
+
+    def batch(self, size, linger=0):
+        payloads = self._head.batch(size, linger)
+        for operator in self._operators:
+            payloads = operator.transform_batch(payloads)
+        return payloads
+
+    @property
+    def description(self):
+        return "{}: {} -> {}".format(self.kind, self._head, " -> ".join(str(o) for o in self._operators))
@@ -27,8 +27,8 @@ class FlowContext(component.Component):
     
     def startup_wait(self): self._started.wait()
 
-    def join(self):
-        if self._thread: self._thread.join()
+    def join(self, timeout=None):
+        if self._thread: self._thread.join(timeout)
 
 class Flow(FlowContext):
     STATE_INIT = 0
@@ -40,13 +40,15 @@ class Flow(FlowContext):
     STATE_ENDED = 6
     
     
-    def __init__(self, source, sink, operator, monitor, flowname):
+    def __init__(self, source, sink, operator, monitor, flowname, options=None):
         super().__init__()
         self._operator = operator
         self._source = source
         self._sink = sink
         self._monitor = monitor
         self._name = flowname
+        self._options = dict(options or {})
+        self._engine = None
 
         self._state = Flow.STATE_INIT
 
@@ -67,9 +69,10 @@ class Flow(FlowContext):
         if not self.source: self._source = REGISTRY.build_source('sh.stdin', {'split': 'false'})
         if not self.sink: self._sink = REGISTRY.build_sink('sh.stdout')
 
-        #If the *monitor* wasn't defined, see if the sink has a preferred monitor,
-        #then pick a default
+        #If the *monitor* wasn't defined, see if the sink or the source has a
+        #preferred monitor, then pick a default
         if not self.monitor: self._monitor = self.sink.suggest_monitor()
+        if not self.monitor: self._monitor = self.source.suggest_monitor()
         if not self.monitor: self._monitor = REGISTRY.build_monitor('start')
         
         from actuator.naming import get_random_name
@@ -101,20 +104,37 @@ class Flow(FlowContext):
     @property
     def state(self): return self._state
 
+    #Replaces the source and chain of operators, which the optimizer does
+    #before the flow is wired. Without any operators, the source is the chain
+    def set_chain(self, source, operators):
+        upstream = None
+        for o in operators:
+            o.set_upstream(upstream)
+            upstream = o
+        self._source = source
+        self._operator = operators[-1] if operators else source
+
     def setup(self):
         #Components stash their args&kwargs until setup time
         #These need to be loaded before wiring because wiring 
         #draws information from these arguments
-        for c in self.components:
-            c.setup()
+        from actuator import startup
+        with startup.phase('setup'):
+            for c in self.components:
+                c.setup()
         
         self._state = Flow.STATE_SETUP
 
     def wire(self):
         #Wire all inflows to the source
         self.source.wire(self.inflows)
-        #Wire the operators to the source
-        self.operator.upstreams[0].set_upstream(self.source)
+        #Wire the operators to the source. If the optimizer has removed every
+        #operator, the source is the whole chain
+        if self.operator is not self.source:
+            self.operator.upstreams[0].set_upstream(self.source)
+        #With the chain complete, the engine can prepare to drive it
+        from actuator.flows import engine
+        self._engine = engine.build(self)
         
         #We're *ready* to run now -- we don't want some other flow starting
         #first and thinking we've already terminated
@@ -122,8 +142,8 @@ class Flow(FlowContext):
 
     def start(self):
         if self.monitor.threaded:
-            self._thread = threading.Thread(target=lambda: self.run(), daemon=True)
-            self._thread.start()
+            from actuator.flows import runtime
+            self._thread = runtime.get(self.option('runtime', 'thread')).start(self)
         else:
             self.run()
         
@@ -144,6 +164,20 @@ class Flow(FlowContext):
 
         
     def run(self):
+        self.begin()
+        self.monitor.start()
+        
+        #monitor has exited, that means we're done
+        self.stop()
+
+    #Equivalent to `run` for flows run as a coroutine by the asyncio runtime,
+    #with anything which may block handed to the runtime's workers
+    async def run_async(self, runtime):
+        await runtime.run(self.begin)
+        await self.monitor.start_async(runtime)
+        await runtime.run(self.stop)
+
+    def begin(self):
         #This method will run after this flow has been wired. It will first
         #set up each of its components. This is normally fast, but if a dep
         #exists, it may take a noticable amount of time.
@@ -155,15 +189,11 @@ class Flow(FlowContext):
         self._state = Flow.STATE_STARTED
         self._started.set()
         
-        #Start all components, the order is [source, op, sink, mon]
+        #Start all components, the order is [source, op, sink], leaving the 
+        #monitor to the caller
         self.source.start()
         [c.start() for c in self.operator.upstreams]
         self.sink.start()
-        self.monitor.start()
-
-        
-        #monitor has exited, that means we're done
-        self.stop()
 
     
     @property
@@ -191,6 +221,18 @@ class Flow(FlowContext):
     @property
     def operator(self): return self._operator
     
+    @property
+    def engine(self): return self._engine
+    
+    @property
+    def options(self): return dict(self._options)
+    
+    #Options can be given for a specific flow, eg `flow name(engine="compiled")`,
+    #falling back to the global value, eg from the command line
+    def option(self, name, default=None):
+        if name in self._options: return self._options[name]
+        return util.get_global(name, default)
+    
     @property
     def kind(self):
         return "{}<{}>".format(self.name, super().kind)
@@ -245,6 +287,8 @@ class Flow(FlowContext):
         d[self.kind]['flow-sink']     = self.sink.description_data
         d[self.kind]['flow-operator'] = self.operator.description_data
         d[self.kind]['flow-monitor']  = self.monitor.description_data
+        if self.options: d[self.kind]['flow-options'] = self.options
+        if self.engine: d[self.kind]['flow-engine'] = self.engine.description
         return d
     
         
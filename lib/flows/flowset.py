@@ -18,13 +18,65 @@ class FlowSet(FlowContext):
         return None
     
     def setup(self, delay=0):
-        for flow in self.flows:
-            flow.set_context(self)
-            if delay: time.sleep(delay)
-        for flow in self.flows:
-            flow.wire()
-            if delay: time.sleep(delay)
+        from actuator import startup
+        with startup.phase('set_context'):
+            for flow in self.flows:
+                flow.set_context(self)
+                if delay: time.sleep(delay)
+        with startup.phase('typecheck'):
+            from actuator.flows import typecheck
+            for flow in self.flows:
+                typecheck.check(flow)
+        with startup.phase('optimize'):
+            from actuator.flows import optimizer
+            optimizer.share(self.flows)
+            for flow in self.flows:
+                optimizer.optimize(flow)
+        with startup.phase('wire'):
+            for flow in self.flows:
+                flow.wire()
+                if delay: time.sleep(delay)
     
+    #Stops flows of a running flowset and removes them from it, giving each
+    #up to `timeout` seconds to finish
+    def remove(self, flows, timeout=None):
+        for flow in flows:
+            flow.stop()
+        for flow in flows:
+            flow.join(timeout)
+            if flow.name: self.scope.release(flow.name)
+        self._flows = [f for f in self.flows if not f in flows]
+
+    #Sets up and starts new flows in a running flowset. The flows already
+    #running carry on as they are, but are given any new inflows and subflows.
+    #If the new flows cannot be set up, the flowset is left as it was
+    def add(self, flows):
+        from actuator.flows import optimizer, typecheck
+        from actuator.components.operator import SubFlow
+        running = self.flows
+        self._flows = running + list(flows)
+        try:
+            for flow in flows:
+                flow.set_context(self)
+            for flow in flows:
+                typecheck.check(flow)
+                optimizer.optimize(flow)
+                flow.wire()
+        except Exception:
+            self._flows = running
+            for flow in flows:
+                if flow.name and flow.scope and self.scope.has_local(flow.name) and self.scope.get_local(flow.name) is flow.scope:
+                    self.scope.release(flow.name)
+            raise
+        for flow in running:
+            flow.source.wire(flow.inflows)
+            for c in flow.components:
+                if isinstance(c, SubFlow): c.set_context(flow)
+        for flow in flows:
+            flow.start()
+        for flow in flows:
+            flow.startup_wait()
+
     def start(self, delay=0):
         self._thread = threading.Thread(target=lambda: self.run(delay), daemon=True)
         self._thread.start()
@@ -0,0 +1,90 @@
+from actuator import log, util
+import threading
+
+
+#Process pools are shared between all flows asking for the same number of
+#worker processes
+__pools = {}
+__pools_lock = threading.Lock()
+def pool(processes):
+    from concurrent.futures import ProcessPoolExecutor
+    with __pools_lock:
+        if not processes in __pools:
+            executor = ProcessPoolExecutor(max_workers=processes)
+            util.add_shutdown_hook(lambda: executor.shutdown(wait=False))
+            __pools[processes] = executor
+        return __pools[processes]
+
+
+#Runs a group of operator kernels in a worker process. Operator classes are
+#generated by their decorators and so cannot be pickled, so each kernel is
+#looked up by name in the worker's own registry instead
+def run_kernels(kernels, payload):
+    from actuator.package import REGISTRY
+    for name, args, params in kernels:
+        payload = REGISTRY.lookup_operator(name).kernel(payload, *args, **params)
+    return payload
+
+def run_kernels_batch(kernels, payloads):
+    return [run_kernels(kernels, payload) for payload in payloads]
+
+
+#An operator can be offloaded if it has a kernel, the worker will find the
+#same operator by name, and the arguments it was created with can be pickled
+def offloadable(operator):
+    import pickle
+    from actuator.package import REGISTRY
+    if operator.kernel == None: return False
+    if not operator.name: return False
+    if REGISTRY.lookup_operator(operator.name) is not type(operator): return False
+    try:
+        pickle.dumps((operator.component_args, operator.component_kwargs))
+    except Exception as e:
+        operator.logger.warn("Cannot offload %s, its arguments cannot be pickled: %s", operator.name, e)
+        return False
+    return True
+
+
+#Given a chain of operators, returns a chain of stages in which each run of
+#adjacent offloadable operators is replaced with a single OffloadedStage, so
+#that the payload is only sent to a worker process once per run. Stages all
+#provide `transform` and `transform_batch`
+def group(operators, processes):
+    stages = []
+    run = []
+    for operator in operators:
+        if offloadable(operator):
+            run.append(operator)
+            continue
+        if run: stages.append(OffloadedStage(run, processes))
+        run = []
+        stages.append(operator)
+    if run: stages.append(OffloadedStage(run, processes))
+    return stages
+
+
+class OffloadedStage:
+    def __init__(self, operators, processes):
+        self._operators = operators
+        self._processes = processes
+        self._kernels = None
+
+    @property
+    def operators(self): return self._operators
+
+    #Args and params are only known once the operators have been set up,
+    #which happens after wiring
+    @property
+    def kernels(self):
+        if self._kernels == None:
+            self._kernels = [(o.name, o.args.as_list, o.params.as_dict) for o in self.operators]
+        return self._kernels
+
+    def transform(self, payload):
+        return pool(self._processes).submit(run_kernels, self.kernels, payload).result()
+
+    def transform_batch(self, payloads):
+        return pool(self._processes).submit(run_kernels_batch, self.kernels, payloads).result()
+
+    def __repr__(self):
+        return "<offloaded: {}>".format("|".join(o.name for o in self.operators))
@@ -0,0 +1,181 @@
+#Rewrites the chain of each flow once its context has been set, before it is
+#wired. Operators which do nothing (eg. the noop given to flows without any)
+#are removed, a constant source followed by pure operators is evaluated once
+#and replaced with the result, and each run of adjacent pure operators is
+#fused into one, so that a payload takes a single call through all of them.
+#Before any of that, flows which poll identical sources on the same interval
+#are given a single shared activation of the source and of the pure operators
+#they all apply to it. Turned off with the `optimize` flow option
+from actuator import util
+
+
+def enabled(flow):
+    return util.parse_bool(flow.option('optimize', True))
+
+
+def optimize(flow):
+    if not enabled(flow): return
+    from actuator.components import operator
+    source = flow.source
+    chain = [o for o in flow.operator.upstreams if not isinstance(o, operator.noop)]
+    if source.constant:
+        source, chain = fold(flow, source, chain)
+    #Offloading already runs adjacent operators with kernels in one call,
+    #and needs them as they are to find them in the worker processes
+    if not flow.option('processes'):
+        chain = fuse(flow, chain)
+    flow.set_chain(source, chain)
+
+
+#A component can only be evaluated ahead of time if its args are known, and
+#not read from variables when the flow starts
+def foldable(component):
+    from actuator.lang.construct import VariableReference
+    def constant(value):
+        if isinstance(value, VariableReference): return False
+        if isinstance(value, (list, tuple)): return all(constant(v) for v in value)
+        if isinstance(value, dict): return all(constant(v) for v in value.values())
+        return True
+    return constant(component.component_args) and constant(component.component_kwargs)
+
+#Evaluation is done with copies of the flow's components, as a component is
+#only set up once and those which are not folded are set up with their flow
+def evaluable(flow, component):
+    copy = type(component)(*component.component_args, **component.component_kwargs)
+    copy.set_name(component.name)
+    copy.set_context(flow)
+    copy.setup()
+    return copy
+
+#Returns the source and the operators left after folding as many of the
+#operators as possible into the source. Anything which fails is left to fail
+#when the flow runs, as it would have without the optimizer
+def fold(flow, source, chain):
+    from actuator.components.source import ConstantSource
+    if not foldable(source): return source, chain
+    try:
+        value = evaluable(flow, source).value
+    except Exception as e:
+        flow.logger.debug("Not folding %s: %s", source, e)
+        return source, chain
+    folded = [source]
+    for o in chain:
+        if not o.pure or not foldable(o): break
+        try:
+            value = evaluable(flow, o).transform(value)
+        except Exception as e:
+            flow.logger.debug("Not folding %s: %s", o, e)
+            break
+        folded.append(o)
+    #The source alone is already as cheap as it will get
+    if len(folded) == 1: return source, chain
+    constant = ConstantSource(value, folded)
+    constant.set_name(source.name)
+    constant.set_context(flow)
+    return constant, chain[len(folded)-1:]
+
+def fuse(flow, chain):
+    from actuator.components.operator import FusedOperator
+    fused = []
+    run = []
+    def end_run():
+        if len(run) > 1:
+            o = FusedOperator(run)
+            o.set_name("|".join(c.name or c.kind for c in run))
+            o.set_context(flow)
+            fused.append(o)
+        else:
+            fused.extend(run)
+    for o in chain:
+        if o.pure:
+            run.append(o)
+            continue
+        end_run()
+        run = []
+        fused.append(o)
+    end_run()
+    return fused
+
+
+#Identifies a component by what it is and what it was created with, so that
+#identical components written in different flows are recognised
+def signature(component):
+    kwargs = sorted(component.component_kwargs.items())
+    return (type(component), component.name, repr(component.component_args), repr(kwargs))
+
+#Flows activated by time rather than by input or demand, and the period of
+#their activations. Others cannot share their source
+def period(flow):
+    from actuator.components.monitor import OnDemandMonitor
+    from actuator.components.decorators import hooks
+    monitor = flow.monitor
+    if not monitor.periodic or isinstance(monitor, OnDemandMonitor): return None
+    if not foldable(monitor): return None
+    default = [p.default for p in hooks(type(monitor)).parameters if p.name == 'sleep']
+    try:
+        sleep = float(monitor.component_kwargs.get('sleep', default[0]))
+    except (TypeError, ValueError, IndexError):
+        return None
+    return sleep if sleep > 0 else None
+
+def share(flows):
+    from actuator.components.source import SharedChain, SharedSource
+    from actuator.components import operator
+    groups = {}
+    for flow in flows:
+        if not enabled(flow) or not flow.source.shareable or not foldable(flow.source): continue
+        sleep = period(flow)
+        if sleep == None: continue
+        groups.setdefault((sleep, signature(flow.source)), []).append(flow)
+    
+    for (sleep, _), group in groups.items():
+        if len(group) < 2: continue
+        chains = [[o for o in f.operator.upstreams if not isinstance(o, operator.noop)] for f in group]
+        #The longest run of pure operators every flow in the group starts with
+        length = 0
+        while all(len(c) > length for c in chains):
+            o = chains[0][length]
+            if not o.pure or not foldable(o): break
+            if any(signature(c[length]) != signature(o) for c in chains[1:]): break
+            length += 1
+        owner = group[0]
+        #Flows activated within half a period of each other are taken to be
+        #activated by the same tick
+        shared = SharedChain(owner.source, chains[0][:length], sleep / 2)
+        names = [f.name for f in group]
+        owner.logger.debug("Sharing %s between flows %s", shared.components, names)
+        for flow, chain in zip(group, chains):
+            source = SharedSource(shared, names)
+            source.set_name(owner.source.name)
+            source.set_context(flow)
+            flow.set_chain(source, chain[length:])
+
+
+#Describes each flow of a set up flowset as it will be run
+def explain(flowset):
+    from actuator.components.source import ConstantSource, SharedSource
+    from actuator.components.operator import FusedOperator
+    from actuator.components.sink import FlowSink
+    def label(c):
+        if isinstance(c, FlowSink): return "@" + c.target_name
+        #Components added to the flow rather than written in it have no name
+        if not c.name: return c.kind
+        if isinstance(c, ConstantSource):
+            return "constant({!r} from {})".format(c.value, " | ".join(label(f) for f in c.folded))
+        if isinstance(c, FusedOperator):
+            return "fused({})".format(" | ".join(label(o) for o in c.operators))
+        if isinstance(c, SharedSource):
+            return "shared({}) with {}".format(" | ".join(label(o) for o in c.shared.components), ", ".join(c.flows))
+        args = [repr(a) for a in c.component_args]
+        args += ["{}={!r}".format(k, v) for k, v in c.component_kwargs.items()]
+        return "{}({})".format(c.name, ", ".join(args)) if args else c.name
+    lines = []
+    for flow in flowset.flows:
+        lines.append("flow {} ({})".format(flow.name, flow.engine.kind if flow.engine else "not wired"))
+        lines.append("  on   {}".format(label(flow.monitor)))
+        lines.append("  from {}".format(label(flow.source)))
+        for o in flow.operator.upstreams:
+            if o is flow.source: continue
+            lines.append("  via  {}".format(label(o)))
+        lines.append("  to   {}".format(label(flow.sink)))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,210 @@
+#Runs a script file, and applies changes to it while it runs (`act --watch`).
+#When the file changes, it is parsed again and compared with the running
+#flowset flow by flow. Flows which are unchanged carry on running, with their
+#state, threads and sockets, while only the flows which were changed, added
+#or removed are stopped or started
+from actuator import log
+import os, time
+
+
+#Reads a script, dropping its comment lines (including any #! line)
+def read_script(path):
+    with open(path, 'r') as fh:
+        expression = fh.read()
+    return "\n".join([l.strip() for l in expression.split("\n") if not l.strip().startswith("#")])
+
+
+#Works out what has to change to go from the running flows, given as
+#(blueprint, flow) pairs, to the given blueprints. A named flow is matched by
+#its name, and kept if its blueprint is unchanged. An unnamed flow can only
+#be matched by an identical blueprint. Returns the pairs to keep, the
+#blueprints of flows to start, and the flows to stop
+def diff(running, blueprints):
+    unmatched = list(running)
+    keep = []
+    start = []
+    for blueprint in blueprints:
+        match = None
+        for pair in unmatched:
+            old = pair[0]
+            if blueprint.name != None and old.name == blueprint.name:
+                match = pair
+                break
+            if blueprint.name == None and old.name == None and old.signature == blueprint.signature:
+                match = pair
+                break
+        if match and match[0].signature == blueprint.signature:
+            unmatched.remove(match)
+            keep.append((blueprint, match[1]))
+        else:
+            start.append(blueprint)
+    return keep, start, [flow for _, flow in unmatched]
+
+
+class Watcher:
+    def __init__(self, path, cache=True, interval=1):
+        self._path = path
+        self._cache = cache
+        self._interval = interval
+        self._flowset = None
+        self._running = []
+        self._stamp = None
+
+    @property
+    def flowset(self): return self._flowset
+
+    def stamp(self):
+        try:
+            st = os.stat(self._path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def start(self, delay=0):
+        from actuator.lang import parser
+        from actuator.flows.flowset import FlowSet
+        self._stamp = self.stamp()
+        blueprints = parser.parse_blueprints(read_script(self._path), self._cache)
+        flows = [b.build() for b in blueprints]
+        self._running = list(zip(blueprints, flows))
+        self._flowset = FlowSet(flows)
+        self._flowset.setup(delay=delay)
+        self._flowset.start(delay=delay)
+        self._flowset.startup_wait()
+
+    #Checks the script every `interval` seconds, until interrupted
+    def run(self):
+        while True:
+            time.sleep(self._interval)
+            stamp = self.stamp()
+            if stamp == None or stamp == self._stamp: continue
+            self._stamp = stamp
+            try:
+                self.reload()
+            except Exception:
+                import traceback
+                log.error("Failed to reload {}, the flows which were running carry on:\n{}".format(self._path, traceback.format_exc()))
+
+    def reload(self):
+        from actuator.lang import parser
+        from actuator.components.source import FlowSource
+        blueprints = parser.parse_blueprints(read_script(self._path), self._cache)
+        keep, start, stop = diff(self._running, blueprints)
+
+        #A flow without a source is given one when it is set up, depending on
+        #whether any flows feed it. Flows for which that has changed have to
+        #be set up again
+        started = [b.build() for b in start]
+        targets = set()
+        for flow in [flow for _, flow in keep] + started:
+            targets.update(o.target_name for o in flow.outflows)
+        for pair in list(keep):
+            blueprint, flow = pair
+            if blueprint.source != None: continue
+            if isinstance(flow.source, FlowSource) != (flow.name in targets):
+                keep.remove(pair)
+                stop.append(flow)
+                start.append(blueprint)
+                started.append(blueprint.build())
+
+        if not start and not stop:
+            log.info("Reloaded {}, no flows changed".format(self._path))
+            return
+        log.info("Reloading {}: stopping {}, starting {}".format(
+            self._path,
+            [f.name for f in stop],
+            [b.name or "(unnamed)" for b in start]
+        ))
+        stopped = [pair for pair in self._running if pair[1] in stop]
+        self._flowset.remove(stop, timeout=self._interval)
+        self._running = keep
+        try:
+            self._flowset.add(started)
+        except Exception:
+            #The flows which were stopped have ended, so run them again from
+            #their blueprints
+            restored = [b.build() for b, _ in stopped]
+            self._flowset.add(restored)
+            self._running = keep + list(zip([b for b, _ in stopped], restored))
+            raise
+        self._running = keep + list(zip(start, started))
+
+    def stop(self):
+        if self._flowset: self._flowset.remove(self._flowset.flows, timeout=self._interval)
+
+
+
+import unittest
+class DiffTests(unittest.TestCase):
+
+    def blueprints(self, expression):
+        from actuator.lang import parser
+        return parser.parse_blueprints(expression)
+
+    def test_diff(self):
+        old = self.blueprints("flow a from 'a'; flow b from 'b'; flow c from 'c'; from 'x'")
+        running = [(b, b.name or 'unnamed') for b in old]
+        keep, start, stop = diff(running, self.blueprints("flow a from 'a'; flow b from 'B'; flow d from 'd'; from 'x'"))
+        self.assertEqual([flow for _, flow in keep], ['a', 'unnamed'])
+        self.assertEqual([b.name for b in start], ['b', 'd'])
+        self.assertEqual(stop, ['b', 'c'])
+
+    def test_unnamed(self):
+        running = [(b, 'unnamed') for b in self.blueprints("from 'x'")]
+        keep, start, stop = diff(running, self.blueprints("from 'y'"))
+        self.assertEqual((keep, len(start), stop), ([], 1, ['unnamed']))
+
+
+class WatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._dir.name, 'script.act')
+        self._watcher = None
+
+    def tearDown(self):
+        if self._watcher: self._watcher.stop()
+        self._dir.cleanup()
+
+    def write(self, script):
+        with open(self._path, 'w') as fh:
+            fh.write(script)
+
+    def running(self):
+        flows = self._watcher.flowset.flows
+        self.assertEqual([flow for _, flow in self._watcher._running], flows)
+        return {flow.name: flow for flow in flows}
+
+    def test_reload(self):
+        self.write("flow a from 'a' to $out on interval(sleep=10); flow b from 'b' to $out on interval(sleep=10)")
+        self._watcher = Watcher(self._path, cache=False)
+        self._watcher.start()
+        before = self.running()
+        self.write("flow a from 'a' to $out on interval(sleep=10); flow b from 'B' to $out on interval(sleep=10); flow c from 'c' to $out on interval(sleep=10)")
+        self._watcher.reload()
+        after = self.running()
+        self.assertEqual(sorted(after), ['a', 'b', 'c'])
+        self.assertIs(after['a'], before['a'])
+        self.assertIsNot(after['b'], before['b'])
+        self.write("flow a from 'a' to $out on interval(sleep=10)")
+        self._watcher.reload()
+        self.assertEqual(sorted(self.running()), ['a'])
+
+    def test_failed_reload(self):
+        self.write("flow a from 'a' to $out on interval(sleep=10); flow b from 'b' to $out on interval(sleep=10)")
+        self._watcher = Watcher(self._path, cache=False)
+        self._watcher.start()
+        before = self.running()
+        self.write("flow a from 'a' to $out on interval(sleep=10); flow b(engine='bogus') from 'b' to $out on interval(sleep=10)")
+        self.assertRaises(Exception, self._watcher.reload)
+        #b is run again, as it was
+        after = self.running()
+        self.assertEqual(sorted(after), ['a', 'b'])
+        self.assertIs(after['a'], before['a'])
+        self.assertEqual(after['b'].state, after['b'].STATE_STARTED)
+        self.assertEqual(after['b'].option('engine'), None)
+        #Going back to the script which is running changes nothing
+        self.write("flow a from 'a' to $out on interval(sleep=10); flow b from 'b' to $out on interval(sleep=10)")
+        self._watcher.reload()
+        self.assertIs(self.running()['b'], after['b'])
@@ -0,0 +1,278 @@
+from actuator import util
+import threading, time
+
+DEFAULT_WORKERS = 8
+
+
+def instructions():
+    return {
+        'thread': ThreadRuntime,
+        'async': AsyncRuntime,
+        'scheduled': ScheduledRuntime,
+    }
+
+
+#Runtimes are shared between all of the flows which select them, and are
+#created the first time they are asked for
+__runtimes = {}
+__runtimes_lock = threading.Lock()
+def get(name):
+    with __runtimes_lock:
+        if not name in __runtimes:
+            if not name in instructions():
+                raise Exception("Unknown runtime '{}'".format(name))
+            __runtimes[name] = instructions()[name]()
+        return __runtimes[name]
+
+#Returns the named runtime only if it has already been created
+def existing(name):
+    with __runtimes_lock:
+        return __runtimes.get(name, None)
+
+
+#A runtime decides how a flow with a threaded monitor is run
+class Runtime:
+    #Starts running the given flow, returning something which can be joined
+    #to wait for the flow to finish
+    def start(self, flow):
+        raise Exception("Unimplemented for {}".format(type(self).__name__))
+
+
+#The original runtime, which gives each flow its own thread
+class ThreadRuntime(Runtime):
+    def start(self, flow):
+        thread = threading.Thread(target=lambda: flow.run(), daemon=True)
+        thread.start()
+        return thread
+
+
+#Runs flows with asynchronous monitors as coroutines on a single event loop,
+#handing each activation to a bounded pool of worker threads, since sources
+#and sinks may block. Flows with other monitors still get their own thread
+class AsyncRuntime(Runtime):
+    def __init__(self):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        workers = int(util.get_global('workers', DEFAULT_WORKERS))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='actuator-worker')
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=lambda: self._run_loop(), daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        import asyncio
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def start(self, flow):
+        import asyncio
+        if not flow.monitor.asynchronous:
+            return get('thread').start(flow)
+        future = asyncio.run_coroutine_threadsafe(flow.run_async(self), self._loop)
+        future.add_done_callback(AsyncRuntime._report)
+        return AsyncRuntime.Task(future)
+
+    #Runs a blocking function on the worker pool
+    async def run(self, fn):
+        return await self._loop.run_in_executor(self._executor, fn)
+
+    @staticmethod
+    def _report(future):
+        import traceback, sys
+        error = future.exception()
+        if error:
+            sys.stderr.write("".join(traceback.format_exception(type(error), error, error.__traceback__)))
+
+    #Joinable handle for a flow running on the event loop
+    class Task:
+        def __init__(self, future):
+            self._future = future
+
+        def join(self, timeout=None):
+            from concurrent import futures
+            futures.wait([self._future], timeout)
+
+
+
+#Owns the deadlines of all flows with periodic monitors in a single heap, and
+#fires their activations onto a bounded pool of worker threads. Deadlines are
+#fixed-rate, so a flow does not drift by the time its activations take, and
+#any slots missed entirely are skipped and counted as overruns. Flows with 
+#other monitors still get their own thread
+class ScheduledRuntime(Runtime):
+    def __init__(self):
+        import itertools
+        from concurrent.futures import ThreadPoolExecutor
+        workers = int(util.get_global('workers', DEFAULT_WORKERS))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='actuator-worker')
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        
+        self._metrics_lock = threading.Lock()
+        self._activations = 0
+        self._overruns = 0
+        self._lag = 0.0
+        self._max_lag = 0.0
+        self._total_lag = 0.0
+        
+        self._thread = threading.Thread(target=lambda: self._dispatch(), daemon=True)
+        self._thread.start()
+
+    def start(self, flow):
+        if not flow.monitor.periodic:
+            return get('thread').start(flow)
+        task = ScheduledRuntime.Task(flow)
+        self._executor.submit(self._begin, task)
+        return task
+
+    #Lag is the time between when an activation was due and when a worker 
+    #began running it
+    @property
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'scheduled': len(self._heap),
+                'activations': self._activations,
+                'overruns': self._overruns,
+                'lag': self._lag,
+                'max_lag': self._max_lag,
+                'mean_lag': self._total_lag / self._activations if self._activations else 0.0,
+            }
+
+    def _schedule(self, task, deadline):
+        import heapq
+        with self._condition:
+            #Stopped while it was being run, after any cancellation
+            stopped = task.flow.monitor.stopped
+            if not stopped:
+                heapq.heappush(self._heap, (deadline, next(self._sequence), task))
+                self._condition.notify()
+        if stopped: self._finish(task)
+
+    def _dispatch(self):
+        import heapq
+        while True:
+            with self._condition:
+                while not self._heap: 
+                    self._condition.wait()
+                deadline, _, task = self._heap[0]
+                delay = deadline - time.time()
+                if delay > 0:
+                    #Woken early if an earlier deadline is scheduled
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+            self._executor.submit(self._fire, task, deadline)
+
+    def _begin(self, task):
+        import traceback
+        try:
+            task.flow.begin()
+        except:
+            task.flow.logger.error(traceback.format_exc())
+            self._finish(task)
+            return
+        task.flow.monitor.on_stop(lambda: self._cancel(task))
+        self._schedule(task, time.time())
+
+    #A stopped flow is finished at once, rather than at its next deadline
+    def _cancel(self, task):
+        import heapq
+        with self._condition:
+            scheduled = [entry for entry in self._heap if entry[2] is task]
+            if not scheduled: return
+            self._heap = [entry for entry in self._heap if entry[2] is not task]
+            heapq.heapify(self._heap)
+            self._condition.notify()
+        self._executor.submit(self._finish, task)
+
+    def _fire(self, task, deadline):
+        import traceback
+        self._record(time.time() - deadline)
+        monitor = task.flow.monitor
+        if monitor.stopped: 
+            return self._finish(task)
+        try:
+            if not monitor.tick(): 
+                return self._finish(task)
+        except:
+            monitor.logger.error(traceback.format_exc())
+        if monitor.stopped: 
+            return self._finish(task)
+        
+        period = monitor.params.sleep
+        now = time.time()
+        if period <= 0:
+            self._schedule(task, now)
+            return
+        deadline += period
+        if deadline < now:
+            import math
+            missed = math.ceil((now - deadline) / period)
+            with self._metrics_lock: self._overruns += missed
+            deadline += missed * period
+        self._schedule(task, deadline)
+
+    def _finish(self, task):
+        import traceback
+        try:
+            task.flow.stop()
+        except:
+            task.flow.logger.error(traceback.format_exc())
+        task.finish()
+
+    def _record(self, lag):
+        with self._metrics_lock:
+            self._activations += 1
+            self._lag = lag
+            self._total_lag += lag
+            if lag > self._max_lag: self._max_lag = lag
+
+    #Joinable handle for a flow being run by the scheduler
+    class Task:
+        def __init__(self, flow):
+            self._flow = flow
+            self._finished = threading.Event()
+
+        @property
+        def flow(self): return self._flow
+
+        def finish(self): self._finished.set()
+
+        def join(self, timeout=None): self._finished.wait(timeout)
+
+
+
+import unittest
+class RuntimeTests(unittest.TestCase):
+
+    #Runs a flow to its end on each runtime, in a new interpreter as the
+    #runtimes are shared by everything in the process
+    def test_runtimes(self):
+        import os, sys, subprocess
+        lib = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        act = os.path.join(os.path.dirname(lib), 'bin', 'act')
+        if not os.path.exists(act): self.skipTest("bin/act is not available")
+        env = dict(os.environ)
+        pythonpath = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env['PYTHONPATH'] = os.pathsep.join(p for p in (pythonpath, env.get('PYTHONPATH')) if p)
+        expression = "from '[1,2,3]' via once | fmt.fromjson | lst.feed on interval(sleep=0.1)"
+        for runtime in instructions():
+            result = subprocess.run([sys.executable, act, '--no-cache', '--runtime', runtime, expression], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+            self.assertEqual(result.stdout.decode().split(), ['1', '2', '3'], "{}: {}".format(runtime, result.stderr.decode()))
+
+    #A flow stopped between activations ends without waiting for its next one
+    def test_scheduled_stop(self):
+        from actuator.lang import parser
+        flowset = parser.parse_flowset("flow hourly(runtime='scheduled') from 'x' to $out on interval(sleep=3600)")
+        flowset.setup()
+        flowset.start()
+        flowset.startup_wait()
+        flow = flowset.flows[0]
+        deadline = time.time() + 5
+        while not flow.scope.has_local('out') and time.time() < deadline: time.sleep(0.01)
+        start = time.time()
+        flowset.remove([flow], timeout=5)
+        self.assertLess(time.time() - start, 2)
+        self.assertFalse(any(entry[2].flow is flow for entry in get('scheduled')._heap))
@@ -76,6 +76,12 @@ class Scope:
         else:
             self.domain(domain)[key] = value
             
+    #Frees a claimed name so that it may be claimed again, eg. by a flow
+    #replacing another of the same name
+    def release(self, key, domain=None):
+        with self._claim_lock:
+            self.domain(domain).pop(key, None)
+
     def claim(self, key, initial=None, domain=None,):
         
         #If it has already been set, return false
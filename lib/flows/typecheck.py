@@ -0,0 +1,154 @@
+#Checks each flow's chain against the types its components declare with
+#@input and @output, once its context has been set and before it is wired.
+#The type known to leave each component is carried to the next, and where it
+#cannot be accepted the flow's logger warns about it before anything starts.
+#Operators receiving a payload of a single known type are given the chance to
+#use an implementation registered for it with @specialise, which can skip the
+#conversions and checks needed for any payload. Turned off with the
+#`typecheck` flow option
+from actuator import util
+
+#Other names used for the same types in declarations
+ALIASES = {
+    'boolean': 'bool',
+    'string': 'str',
+    'integer': 'int',
+    'float': 'real',
+    'null': 'none',
+}
+
+#Types which are accepted wherever another is expected
+WIDENS = {
+    'bool': ['int', 'real'],
+    'int': ['real'],
+}
+
+
+def enabled(flow):
+    return util.parse_bool(flow.option('typecheck', True))
+
+
+#Splits a declaration such as 'int, real' or 'list[dict{str: str}]' into its
+#alternatives, each a (name, element) pair where element is what is inside
+#the brackets, if anything. Returns None for 'any' or no declaration
+def parse(ptype):
+    if ptype == None: return None
+    alternatives = []
+    depth = 0
+    part = ""
+    for c in ptype + ",":
+        if c in "[{": depth += 1
+        if c in "]}": depth -= 1
+        if c == "," and depth == 0:
+            part = part.strip()
+            if part: alternatives.append(part)
+            part = ""
+            continue
+        part += c
+    parsed = []
+    for alternative in alternatives:
+        name, element = alternative, None
+        for bracket in "[{":
+            if bracket in alternative:
+                name, element = alternative.split(bracket, 1)
+                element = element[:-1].strip()
+                break
+        name = name.strip().lower()
+        name = ALIASES.get(name, name)
+        if name == 'any': return None
+        parsed.append((name, element))
+    return tuple(parsed) or None
+
+def accepts(accepted, produced):
+    accepted = parse(accepted)
+    produced = parse(produced)
+    if accepted == None or produced == None: return True
+    for name, element in produced:
+        #None is how most components signal that they have nothing, and
+        #anything has a truth value
+        if name == 'none': return True
+        for accepted_name, accepted_element in accepted:
+            if accepted_name == 'bool': return True
+            if accepted_name != name and not accepted_name in WIDENS.get(name, []): continue
+            if element == None or accepted_element == None: return True
+            if accepts(accepted_element, element): return True
+    return False
+
+#Whether a specialisation for `ptype` can be used for payloads of the type
+#`known`. Every payload has to be of that type, so `known` cannot have
+#alternatives
+def specialises(ptype, known):
+    ptype = parse(ptype)
+    known = parse(known)
+    if ptype == None or known == None or len(known) != 1: return False
+    return known[0][0] in [name for name, _ in ptype]
+
+
+def ptype(description):
+    return description.ptype if description != None else None
+
+def check(flow):
+    if not enabled(flow): return []
+    from actuator.components import operator
+    mismatches = []
+    known = ptype(flow.source.output_description)
+    for o in flow.operator.upstreams:
+        if o is flow.source: continue
+        #A noop passes on whatever it is given
+        if isinstance(o, operator.noop): continue
+        accepted = ptype(o.input_description)
+        if not accepts(accepted, known):
+            mismatches.append("{} expects {} but is given {}".format(o.name or o.kind, accepted, known))
+        elif known != None and o.specialise(known):
+            flow.logger.debug("Specialised %s for %s", o.name or o.kind, known)
+        known = ptype(o.output_description)
+    sink = flow.sink
+    if sink != None and not accepts(ptype(sink.input_description), known):
+        mismatches.append("{} expects {} but is given {}".format(sink.name or sink.kind, ptype(sink.input_description), known))
+    for mismatch in mismatches:
+        flow.logger.warn("Type mismatch in flow %s: %s", flow.name, mismatch)
+    return mismatches
+
+
+
+import unittest
+class TypeTests(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse('any'), None)
+        self.assertEqual(parse('int, real'), (('int', None), ('real', None)))
+        self.assertEqual(parse('list[dict{str: str}]'), (('list', 'dict{str: str}'),))
+        self.assertEqual(parse('Boolean'), (('bool', None),))
+
+    def test_accepts(self):
+        self.assertTrue(accepts('list', 'list[str]'))
+        self.assertTrue(accepts('real', 'int'))
+        self.assertTrue(accepts('str, list', 'list[str]'))
+        self.assertTrue(accepts('bool', 'dict'))
+        self.assertTrue(accepts('str', 'any'))
+        self.assertFalse(accepts('str', 'list[str]'))
+        self.assertFalse(accepts('list[int]', 'list[str]'))
+        self.assertFalse(accepts('int', 'real'))
+
+    def test_specialises(self):
+        self.assertTrue(specialises('list', 'list[str]'))
+        self.assertFalse(specialises('str', 'str, bytes'))
+        self.assertFalse(specialises('str', 'any'))
+
+    def test_check(self):
+        from actuator.lang import parser
+        flowset = parser.parse_flowset("flow a from `true` via split(' ') | bool.all to $x; flow b from 'x' via lst.head | fmt.fromjson | bool.all")
+        for flow in flowset.flows:
+            flow.set_context(flowset)
+        a, b = flowset.flows
+        self.assertEqual(check(a), [])
+        self.assertEqual([o.specialisation != None for o in a.operator.upstreams], [True, True])
+        split = a.operator.upstreams[0]
+        split.setup()
+        self.assertEqual(split.transform('x y'), ['x', 'y'])
+        self.assertEqual(split.transform(None), None)
+        self.assertEqual(check(b), [])
+        flowset = parser.parse_flowset("from 'x' via bool.all")
+        flow = flowset.flows[0]
+        flow.set_context(flowset)
+        self.assertEqual(len(check(flow)), 1)
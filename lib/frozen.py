@@ -0,0 +1,137 @@
+#Read-only payloads which can be shared between flows, variables and sinks
+#without copying. A payload is frozen once, by whoever publishes it, and
+#from then on every reader holds a reference to the same structure. Frozen
+#containers are subclasses of dict and list, so operators which only read
+#their payload (or build a new one from it) work unchanged, while any attempt
+#to modify one in place raises an error instead of changing another flow's
+#data. Freezing reuses any part of a payload which is already frozen
+
+
+class FrozenError(TypeError):
+    pass
+
+def _readonly(self, *args, **kwargs):
+    raise FrozenError("{} payloads are read-only".format(type(self).__name__))
+
+
+class FrozenDict(dict):
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    #Immutable, so copies can share this structure
+    def __copy__(self): return self
+    def __deepcopy__(self, memo): return self
+
+    #The default pickling fills in an empty instance item by item
+    def __reduce__(self): return (FrozenDict, (dict(self),))
+
+    def __repr__(self): return "frozen({})".format(dict.__repr__(self))
+
+
+class FrozenList(list):
+    __setitem__ = __delitem__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __iadd__ = __imul__ = _readonly
+
+    def __copy__(self): return self
+    def __deepcopy__(self, memo): return self
+
+    def __reduce__(self): return (FrozenList, (list(self),))
+
+    def __repr__(self): return "frozen({})".format(list.__repr__(self))
+
+
+#Returns a read-only version of the given payload. Scalars are already
+#immutable and are returned as they are
+def freeze(value):
+    if isinstance(value, (FrozenDict, FrozenList)): return value
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+#Returns a mutable deep copy of a (possibly) frozen payload, for the rare
+#consumer which must modify its input in place
+def thaw(value):
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [thaw(v) for v in value]
+    return value
+
+def is_frozen(value):
+    return isinstance(value, (FrozenDict, FrozenList))
+
+#Returns a payload which the receiver may modify without changing it for
+#anyone else holding it. Frozen payloads and scalars are shared as they are
+def unshared(value):
+    if isinstance(value, (dict, list, set, bytearray)) and not is_frozen(value):
+        import copy
+        return copy.deepcopy(value)
+    return value
+
+#Freezes the payload if the given flow has been asked to, with the `frozen`
+#flow option or the --frozen command line option
+def freeze_for(flow, value):
+    from actuator import util
+    if flow != None and util.parse_bool(flow.option('frozen', False)):
+        return freeze(value)
+    return value
+
+
+#Frozen payloads should serialise as the plain mappings and sequences they
+#stand in for. yaml is optional and slow to import, so this is left to
+#whatever is about to dump a payload as yaml
+__yaml_registered = False
+def register_yaml():
+    global __yaml_registered
+    if __yaml_registered: return
+    import yaml
+    for dumper in (yaml.Dumper, yaml.SafeDumper):
+        dumper.add_representer(FrozenDict, lambda d, v: d.represent_dict(v))
+        dumper.add_representer(FrozenList, lambda d, v: d.represent_list(v))
+    __yaml_registered = True
+
+
+
+import unittest
+class FrozenTests(unittest.TestCase):
+
+    def test_readonly(self):
+        f = freeze({'a': [1, 2, {'b': 3}]})
+        self.assertEqual(f, {'a': [1, 2, {'b': 3}]})
+        with self.assertRaises(FrozenError): f['c'] = 1
+        with self.assertRaises(FrozenError): f['a'].append(4)
+        with self.assertRaises(FrozenError): f['a'][2].update(c=1)
+
+    def test_sharing(self):
+        import copy
+        f = freeze({'a': [1, 2]})
+        self.assertIs(freeze(f), f)
+        self.assertIs(freeze({'b': f})['b'], f)
+        self.assertIs(copy.deepcopy(f), f)
+
+    def test_pickle(self):
+        import pickle
+        f = freeze({'a': [1, (2, 3)]})
+        g = pickle.loads(pickle.dumps(f))
+        self.assertEqual(f, g)
+        self.assertTrue(is_frozen(g['a']))
+
+    def test_unshared(self):
+        f = freeze({'a': [1, 2]})
+        self.assertIs(unshared(f), f)
+        value = {'a': [1, 2], 'b': f}
+        copy = unshared(value)
+        copy['a'].append(3)
+        self.assertEqual(value['a'], [1, 2])
+        self.assertIs(copy['b'], f)
+
+    def test_thaw(self):
+        t = thaw(freeze({'a': [1, 2]}))
+        t['a'].append(3)
+        self.assertEqual(t, {'a': [1, 2, 3]})
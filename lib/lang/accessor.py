@@ -1,8 +1,6 @@
 from actuator import log
 
 def extract(o, key, _default=None):
-    import six
-    
     if key == None: return o
     
     #Integer extractors cause the target object to be treated as a list
@@ -58,7 +56,10 @@ def compose(*args):
     from functools import reduce
     return reduce(_compose, args)
     
-def accessor(access_elements):
+#Splits an accessor string or list into its elements: a key or index, a
+#list of one key to map over a list, or a key and value to filter a list of
+#dicts by
+def elements(access_elements):
     if isinstance(access_elements, str):
         strings = access_elements.split(".")
     elif isinstance(access_elements, (list, tuple)):
@@ -66,23 +67,91 @@ def accessor(access_elements):
     else:
         raise Exception("Unknown input format")
     
-    components = []
+    result = []
     for s in strings:
-        if isinstance(s, int):
-            components.append(s)
-        elif isinstance(s, list):
+        if isinstance(s, list) and not len(s) in (1, 2):
+            raise Exception("List accessor elements must have one or two items")
+        if isinstance(s, (int, str, list)):
+            result.append(s)
+    return result
+
+#The general accessor, which works out how to apply each element every time
+#it is used
+def generic_accessor(access_elements):
+    components = []
+    for s in elements(access_elements):
+        if isinstance(s, list):
             if len(s) == 1:
                 components.append(mapper(s[0]))
-            elif len(s) == 2:
+            else:
                 key, value = s
                 components.append(dicts_filterer(key, value))
-            else:
-                raise Exception("List accessor elements must have one or two items")
-        elif isinstance(s, str):
+        else:
             components.append(s)
 
     return compose(*components)
 
+#Returns the accessor compiled into a function specialised for the payloads
+#it usually sees. Integer indexes are plain item lookups, and string keys go
+#straight to the dict lookup or attribute a dict or object payload needs,
+#falling back to `extract` when a payload has any other shape. Any error
+#runs the generic accessor instead, which reports it as it always has
+def accessor(access_elements):
+    steps = [compiled_element(s) for s in elements(access_elements)]
+    generic = generic_accessor(access_elements)
+    if len(steps) == 1:
+        fast = steps[0]
+    else:
+        def fast(o):
+            for step in steps:
+                o = step(o)
+            return o
+    def access(o):
+        try:
+            return fast(o)
+        except Exception:
+            return generic(o)
+    return access
+
+def compiled_element(element):
+    import operator
+    if isinstance(element, int):
+        return operator.itemgetter(element)
+    if isinstance(element, str):
+        return compiled_key(element)
+    if len(element) == 1:
+        key = element[0]
+        get = compiled_key(key) if isinstance(key, str) else extractor(key)
+        return lambda lst: [get(o) for o in lst]
+    key, value = element
+    get = compiled_key(key) if isinstance(key, str) else extractor(key)
+    def matches(d):
+        v = get(d)
+        return (v if type(v) is str else str(v)) == value
+    return lambda dicts: [d for d in dicts if matches(d)]
+
+#The steps `extract` takes for a string key, in the same order, checking the
+#shape of the payload first so that most payloads need a single lookup
+def compiled_key(key, default=None):
+    from actuator.frozen import FrozenDict
+    #Keys naming a dict method are attributes of every dict
+    dicts = () if hasattr(dict, key) else (dict, FrozenDict)
+    index = int(key) if intable(key) else None
+    def step(o):
+        t = type(o)
+        if t in dicts:
+            return o.get(key, default)
+        if index != None and (t is list or t is tuple):
+            if -len(o) <= index < len(o): return o[index]
+            return extract(o, key, default)
+        if t is not list and t is not tuple:
+            try:
+                return getattr(o, key)
+            except AttributeError:
+                pass
+        return extract(o, key, default)
+    return step
+
 def access(obj, access_elements):
     return accessor(access_elements)(obj)
  
@@ -96,29 +165,26 @@ def mapper(fn):
     return partial(listmap, fn) 
     
     
-from pyparsing import Or, Suppress, ZeroOrMore
+from pyparsing import MatchFirst, Suppress, ZeroOrMore, Optional
 from actuator.lang import symbols, values
 from actuator.lang.construct import PackageConstruct, ParametersConstruct, ComponentBlueprint
 
-PS_ACCESSOR_ELEMENT = Or([
+PS_ACCESSOR_ELEMENT = MatchFirst([
     values.PS_IDENTIFIER,
     values.PS_INT,
 ])
 
 PS_ACCESSOR_COLLECTION = (
     Suppress('[') + 
-    Or([
-        #Map
-        PS_ACCESSOR_ELEMENT,
-        #Filter
-        PS_ACCESSOR_ELEMENT + Suppress('=') + values.PS_PRIMITIVE
-    ]) + 
+    #Map, or filter if given a value
+    PS_ACCESSOR_ELEMENT + 
+    Optional(Suppress('=') + values.PS_PRIMITIVE) + 
     Suppress(']')
 ).setParseAction(
     lambda ts: [list(ts)]
 )
 
-PS_ACCESSOR_COMPONENT = Or([
+PS_ACCESSOR_COMPONENT = MatchFirst([
     PS_ACCESSOR_ELEMENT,
     PS_ACCESSOR_COLLECTION
 ])
@@ -133,3 +199,36 @@ PS_ACCESSOR = (
 ).setParseAction(
     lambda ts: list(ts)
 )
+
+
+
+import unittest
+class AccessorTests(unittest.TestCase):
+
+    #The compiled accessor has to agree with the generic one for every shape
+    def assertAgrees(self, elements, payload):
+        self.assertEqual(accessor(elements)(payload), generic_accessor(elements)(payload))
+
+    def test_dict(self):
+        payload = {'a': [{'b': 1, 'name': 'foo'}, {'b': 2, 'name': 'bar'}], 'items': 3}
+        self.assertEqual(accessor(['a', 0, 'b'])(payload), 1)
+        self.assertEqual(accessor("a.1.b")(payload), 2)
+        self.assertEqual(accessor(['a', ['name', 'foo']])(payload), [{'b': 1, 'name': 'foo'}])
+        self.assertEqual(accessor(['a', ['b']])(payload), [1, 2])
+        for elements in (['a', 0, 'b'], "a.1.b", "a.5", "missing", "items", ['a', ['b', '2']], ['a', ['b', 2]]):
+            self.assertAgrees(elements, payload)
+
+    def test_shapes(self):
+        import collections
+        Point = collections.namedtuple('Point', ['x', 'y'])
+        get = accessor("x")
+        self.assertEqual(get(Point(1, 2)), 1)
+        self.assertEqual(get({'x': 3}), 3)
+        self.assertEqual(get([5, 6]), None)
+        self.assertEqual(accessor("1")(['a', 'b']), 'b')
+        self.assertEqual(accessor("1")(('a', 'b')), 'b')
+        self.assertEqual(accessor("1")({'1': 'c'}), 'c')
+
+    def test_errors(self):
+        with self.assertRaises(IndexError):
+            accessor([3])([1, 2])
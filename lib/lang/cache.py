@@ -0,0 +1,139 @@
+#Keeps parsed flowset expressions on disk, so that a script run over and over
+#(eg. from cron) is only parsed the first time. Entries are keyed by the
+#expression and a fingerprint of the grammar which parsed it, so changes to
+#either simply miss the cache. Only the blueprints are kept, flows are still
+#built from them on every run. Entries left by other grammars or expressions
+#no longer run are evicted, least recently used first, once there are more
+#than MAX_ENTRIES
+from actuator import log
+import os
+
+#Modules whose contents decide what an expression parses to
+GRAMMAR_MODULES = ['symbols', 'keywords', 'values', 'accessor', 'components', 'flows', 'construct']
+
+MAX_ENTRIES = 256
+
+def directory():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'actuator', 'flowsets')
+
+__fingerprint = None
+def fingerprint():
+    global __fingerprint
+    if __fingerprint == None:
+        import hashlib, sys
+        h = hashlib.sha256()
+        h.update("{}.{}".format(*sys.version_info[:2]).encode())
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in GRAMMAR_MODULES:
+            with open(os.path.join(here, name + '.py'), 'rb') as fh:
+                h.update(fh.read())
+        __fingerprint = h.hexdigest()
+    return __fingerprint
+
+def key(expression):
+    import hashlib
+    h = hashlib.sha256()
+    h.update(fingerprint().encode())
+    h.update(expression.encode())
+    return h.hexdigest()
+
+def path(expression):
+    return os.path.join(directory(), key(expression) + '.pickle')
+
+
+#Returns the blueprints for this expression, or None if they are not cached
+#or cannot be read
+def load(expression):
+    import pickle
+    filename = path(expression)
+    try:
+        with open(filename, 'rb') as fh:
+            blueprints = pickle.load(fh)
+        #Marks the entry as recently used, so that it is evicted last
+        os.utime(filename)
+        log.debug("Loaded parsed flowset from {}".format(filename))
+        return blueprints
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warn("Ignoring unreadable parse cache entry {}: {}".format(filename, e))
+        return None
+
+def store(expression, blueprints):
+    import pickle, tempfile
+    filename = path(expression)
+    try:
+        os.makedirs(os.path.dirname(filename), mode=0o700, exist_ok=True)
+        #Write to a temporary file first, so that concurrent runs never read
+        #a partial entry
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(blueprints, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, filename)
+        prune()
+    except Exception as e:
+        log.warn("Could not write parse cache entry {}: {}".format(filename, e))
+
+#Removes the least recently used entries beyond MAX_ENTRIES
+def prune(limit=None):
+    if limit == None: limit = MAX_ENTRIES
+    entries = []
+    with os.scandir(directory()) as it:
+        for entry in it:
+            if not entry.name.endswith('.pickle'): continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    if len(entries) <= limit: return
+    entries.sort()
+    for _, filename in entries[:len(entries) - limit]:
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            #Removed by another run pruning at the same time
+            pass
+
+
+
+import unittest
+class CacheTests(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self._previous = os.environ.get('XDG_CACHE_HOME')
+        self._dir = tempfile.TemporaryDirectory()
+        os.environ['XDG_CACHE_HOME'] = self._dir.name
+
+    def tearDown(self):
+        if self._previous == None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self._previous
+        self._dir.cleanup()
+
+    def test_roundtrip(self):
+        from actuator.lang import parser
+        expression = "flow a(engine='compiled') from '1,2' via split(',') | lst.ints to @b; flow b from inflows"
+        self.assertEqual(load(expression), None)
+        parsed = parser.parse_blueprints(expression, cache=True)
+        cached = load(expression)
+        self.assertEqual([b.name for b in cached], ['a', 'b'])
+        flowset = parser.parse_flowset(expression, cache=True)
+        self.assertEqual([f.name for f in flowset.flows], ['a', 'b'])
+        self.assertEqual(flowset.flows[0].option('engine'), 'compiled')
+
+    def test_key(self):
+        self.assertNotEqual(key("from 1"), key("from 2"))
+        self.assertEqual(key("from 1"), key("from 1"))
+
+    def test_prune(self):
+        expressions = ["from {}".format(i) for i in range(4)]
+        for i, expression in enumerate(expressions):
+            store(expression, [])
+            os.utime(path(expression), (i, i))
+        #Loading an entry keeps it
+        load(expressions[0])
+        prune(2)
+        self.assertEqual([os.path.exists(path(e)) for e in expressions], [True, False, False, True])
@@ -1,7 +1,7 @@
 from actuator.lang.construct import PackageConstruct, ParametersConstruct, ComponentBlueprint
 from actuator.lang import symbols, keywords, values, accessor
 
-from pyparsing import srange, Word, Or, And, Suppress, ZeroOrMore, OneOrMore, QuotedString
+from pyparsing import srange, Word, Regex, MatchFirst, And, Suppress, ZeroOrMore, OneOrMore, QuotedString, Optional
 
 #####################
 # COMPONENT PARSING #
@@ -14,14 +14,13 @@ def build_comp_pkg(ts):
         return PackageConstruct(ts[0], ts[1])
     else:
         raise Exception("Package name requires either 1 or 2 arguments")
-PS_COMP_PKG = Or([
-        values.PS_IDENTIFIER,
-        values.PS_IDENTIFIER + Suppress(".") + values.PS_IDENTIFIER
-]).setParseAction(build_comp_pkg)
+PS_COMP_PKG = Regex(r"(?P<package>{0})(?:\s*\.\s*(?P<element>{0}))?".format(values.IDENTIFIER)).setParseAction(
+    lambda ts: build_comp_pkg([ts['package'], ts['element']] if ts.get('element') else [ts['package']])
+)
 
 PS_COMP_PARAMETER_KEY = values.PS_IDENTIFIER.copy()
 PS_COMP_PARAMETER_VALUE = values.PS_VALUE.copy()
-PS_COMP_PARAMETER = Or([
+PS_COMP_PARAMETER = MatchFirst([
     PS_COMP_PARAMETER_KEY + Suppress("=") + PS_COMP_PARAMETER_VALUE,
     PS_COMP_PARAMETER_VALUE
 ]).setParseAction(
@@ -51,10 +50,9 @@ def build_comp_expression(ts):
     if len(ts) >= 2:
         params = ts[1]
     return ComponentBlueprint(PackageConstruct(pkg.package, pkg.element), params)
-PS_COMP_EXPRESSION = Or([
-    PS_COMP_PKG,
-    PS_COMP_PKG + PS_COMP_PARAMETERS
-]).setParseAction(build_comp_expression)
+PS_COMP_EXPRESSION = (
+    PS_COMP_PKG + Optional(PS_COMP_PARAMETERS)
+).setParseAction(build_comp_expression)
 
 
 
@@ -62,9 +60,12 @@ PS_COMP_EXPRESSION = Or([
 # COMPONENTS SYNTAX SUGAR #
 ###########################
 
-PS_COMP_SUGAR_FLOW = values.PS_FLOW.copy().addParseAction(
-    lambda ts: ComponentBlueprint(PackageConstruct("_flowref", None), ParametersConstruct(ts[0]))
-)
+#A flow reference may be given parameters, eg `to @target(queue=100)`
+def build_comp_sugar_flow(ts):
+    params = ParametersConstruct()
+    if len(ts) >= 2: params = ts[1]
+    return ComponentBlueprint(PackageConstruct("_flowref", None), ParametersConstruct(ts[0], *params.args, **params.kwargs))
+PS_COMP_SUGAR_FLOW = (values.PS_FLOW.copy() + Optional(PS_COMP_PARAMETERS)).setParseAction(build_comp_sugar_flow)
 
 PS_COMP_SUGAR_VAR = values.PS_VAR.copy().addParseAction(
     lambda ts: ComponentBlueprint(PackageConstruct("var", None), ParametersConstruct(ts[0].reference))
@@ -91,7 +92,9 @@ PS_COMP_SUGAR_REAL = values.PS_REAL.copy().addParseAction(
 )
 
 
-PS_SUGAR_COMP = Or([
+#Each kind of sugar has its own leading character, except for reals which
+#must be tried before the integers they start with
+PS_SUGAR_COMP = MatchFirst([
     PS_COMP_SUGAR_FLOW,
     PS_COMP_SUGAR_VAR,
     PS_COMP_SUGAR_SHELL,
@@ -101,7 +104,7 @@ PS_SUGAR_COMP = Or([
     PS_COMP_SUGAR_INT
 ])
 
-PS_COMP = Or([
+PS_COMP = MatchFirst([
     PS_COMP_EXPRESSION,
     PS_SUGAR_COMP
 ])
@@ -109,7 +112,7 @@ PS_COMP = Or([
 PS_COMP_CHAIN = And([
     PS_COMP,
     ZeroOrMore(
-        Or(['|', '>']) + 
+        MatchFirst(['|', '>']) + 
         PS_COMP
     )
 ])
@@ -141,6 +144,13 @@ class ComponentTests(unittest.TestCase):
         self.assertEqual(cb.parameters.args[0].reference, "flowname")
         c = cb.build(keywords.SINK)
 
+    def test_sugar_flow_params(self):
+        cb = PS_COMP.parseString("@flowname(queue=10, policy='drop_oldest')")[0]
+        self.assertEqual(cb.package.path, "_flowref")
+        self.assertEqual(cb.parameters.args[0].reference, "flowname")
+        self.assertEqual(cb.parameters.kwargs, {'queue': 10, 'policy': 'drop_oldest'})
+        c = cb.build(keywords.SINK)
+
     def test_sugar_var(self):
         cb = PS_COMP.parseString("$var.foo.bar.baz")[0]
         self.assertEqual(cb.package.path, "var")
@@ -1,6 +1,14 @@
 from actuator.lang import keywords
 from actuator.package import REGISTRY
 
+#The registry role of each part of a flow expression
+ROLES = {
+    keywords.SOURCE: 'sources',
+    keywords.OPERATOR: 'operators',
+    keywords.SINK: 'sinks',
+    keywords.MONITOR: 'monitors',
+}
+
 #Base class for intermediate objects/structs generated by parser
 class Construct:
     @property
@@ -65,14 +73,8 @@ class ComponentBlueprint(Construct):
     #expression this component will be, source, sink, operator, monitor
     def build(self, role):
         builder = None
-        if role == keywords.SOURCE:
-            builder = REGISTRY.lookup_source(self.package.path)
-        elif role == keywords.OPERATOR:
-            builder = REGISTRY.lookup_operator(self.package.path)
-        elif role == keywords.SINK:
-            builder = REGISTRY.lookup_sink(self.package.path)
-        elif role == keywords.MONITOR:
-            builder = REGISTRY.lookup_monitor(self.package.path)
+        if role in ROLES:
+            builder = REGISTRY.lookup_item(self.package.path, ROLES[role])
         
         if not builder:
             raise Exception("Could not build {name} as '{role}'".format(name=self.package.path, role=role))
@@ -85,6 +87,76 @@ class ComponentBlueprint(Construct):
         return component
 
 
+#An operator blueprint followed by links to others, each either piped with
+#`|` or, with `>`, a sink blueprint to be used as an operator
+class ChainBlueprint(Construct):
+    def __init__(self, head, links):
+        self._head = head
+        self._links = list(links)
+
+    @property
+    def name(self):
+        return " ".join([self.head.name] + ["{} {}".format(code, cb.name) for code, cb in self.links])
+
+    @property
+    def head(self): return self._head
+
+    @property
+    def links(self): return self._links
+
+    def build(self, role):
+        from actuator.components.operator import SinkOperator
+        op = self.head.build(role)
+        for code, cb in self.links:
+            if code == "|":
+                newop = cb.build(role)
+            elif code == ">":
+                newop = SinkOperator(cb.build(keywords.SINK))
+            else:
+                raise Exception("Failed to construct operator pipeline") 
+            newop.set_upstream(op)
+            op = newop
+        return op
+
+
+#A parsed flow expression, from which any number of identical flows can be
+#built
+class FlowBlueprint(Construct):
+    def __init__(self, source, sink, operator, monitor, flowname, options=None):
+        self._source = source
+        self._sink = sink
+        self._operator = operator
+        self._monitor = monitor
+        self._flowname = flowname
+        self._options = options
+
+    @property
+    def name(self): return self._flowname
+
+    @property
+    def source(self): return self._source
+
+    #Blueprints parsed from the same flow expression have the same signature,
+    #so that a flow can be recognised when a script is changed around it
+    @property
+    def signature(self):
+        import pickle
+        return pickle.dumps(self, protocol=4)
+
+    def build(self):
+        from actuator.flows.flow import Flow
+        def build(blueprint, role):
+            return blueprint.build(role) if blueprint else None
+        return Flow(
+            build(self._source, keywords.SOURCE),
+            build(self._sink, keywords.SINK),
+            build(self._operator, keywords.OPERATOR),
+            build(self._monitor, keywords.MONITOR),
+            self._flowname,
+            self._options
+        )
+
+
 class PackageConstruct(Construct):
     def __init__(self, package, element):
         self._package = package
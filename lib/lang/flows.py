@@ -1,60 +1,40 @@
 from actuator.lang import symbols, keywords, values, components
+from actuator.lang.construct import ChainBlueprint, FlowBlueprint
 
-from pyparsing import Or, MatchFirst, Keyword, ZeroOrMore, OneOrMore, Suppress, Optional, StringEnd
+from pyparsing import MatchFirst, Keyword, ZeroOrMore, OneOrMore, Suppress, Optional, StringEnd
 
 ###########################
 # FLOW EXPRESSION PARSING #
 ###########################
 
+#Parsing produces a tree of blueprints, which are built into components and
+#flows separately, so that a parsed expression can be kept and built again
 
-PS_SEG_SOURCE_VALUE = components.PS_COMP.copy().setParseAction(
-    lambda ts: ts[0].build(keywords.SOURCE)
-)
+
+PS_SEG_SOURCE_VALUE = components.PS_COMP.copy()
 PS_SEG_SOURCE = (Suppress(Keyword(keywords.SOURCE)) + PS_SEG_SOURCE_VALUE).setParseAction(
     lambda ts: [[keywords.SOURCE, ts[0]]]
 )
 
-def build_seg_operator(kw, ts):
-    opchain = ts[:]
-
-    op = opchain.pop(0).build(kw)
-    code = None
-    
-    while opchain:
-        code = opchain.pop(0)
-        cb = opchain.pop(0)
-        if code == "|" or code == None:
-            newop = cb.build(kw)
-        elif code == ">" and op != None:
-            sink = cb.build(keywords.SINK)
-            newop = SinkOperator(sink)
-        else:
-            raise Exception("Faield to construct operator pipeline") 
-        if op: newop.set_upstream(op)
-        op = newop
-        
-    return op
+def build_seg_operator(ts):
+    chain = list(ts)
+    links = [(chain[i], chain[i+1]) for i in range(1, len(chain), 2)]
+    return ChainBlueprint(chain[0], links)
 
-PS_SEG_OPERATOR_VALUE = components.PS_COMP_CHAIN.copy().addParseAction(
-    lambda ts: build_seg_operator(keywords.OPERATOR, ts)
-)
+PS_SEG_OPERATOR_VALUE = components.PS_COMP_CHAIN.copy().addParseAction(build_seg_operator)
 PS_SEG_OPERATOR = (Suppress(Keyword(keywords.OPERATOR)) + PS_SEG_OPERATOR_VALUE).setParseAction(
     lambda ts: [[keywords.OPERATOR, ts[0]]]
 )
 
 
 
-PS_SEG_SINK_VALUE = components.PS_COMP.copy().setParseAction(
-    lambda ts: ts[0].build(keywords.SINK)
-)
+PS_SEG_SINK_VALUE = components.PS_COMP.copy()
 PS_SEG_SINK = (Suppress(Keyword(keywords.SINK)) + PS_SEG_SINK_VALUE).setParseAction(
     lambda ts: [[keywords.SINK, ts[0]]]
 )
 
 
-PS_SEG_MONITOR_VALUE = components.PS_COMP.copy().setParseAction(
-    lambda ts: ts[0].build(keywords.MONITOR)
-)
+PS_SEG_MONITOR_VALUE = components.PS_COMP.copy()
 PS_SEG_MONITOR = (Suppress(Keyword(keywords.MONITOR)) + PS_SEG_MONITOR_VALUE).setParseAction(
     lambda ts: [[keywords.MONITOR, ts[0]]]
 )
@@ -64,11 +44,25 @@ PS_SEG_MONITOR = (Suppress(Keyword(keywords.MONITOR)) + PS_SEG_MONITOR_VALUE).se
 PS_SEG_NAME_VALUE = values.PS_IDENTIFIER.copy().setParseAction(
     lambda ts: ts
 )
-PS_SEG_NAME = (Keyword(keywords.FLOW) + PS_SEG_NAME_VALUE).setParseAction(
-    lambda ts: [ts]
-)
-
-PS_SEG = Or([
+SEG_OPTIONS = "options"
+
+#Flow options, eg `flow name(engine="compiled")`, are given as named 
+#parameters following the flow's name
+def build_seg_name(ts):
+    segs = [[keywords.FLOW, ts[1]]]
+    if len(ts) > 2:
+        options = ts[2]
+        if options.args:
+            raise Exception("Options for flow {} must be named".format(ts[1]))
+        segs.append([SEG_OPTIONS, options.kwargs])
+    return segs
+PS_SEG_NAME = (
+    Keyword(keywords.FLOW) + 
+    PS_SEG_NAME_VALUE + 
+    Optional(components.PS_COMP_PARAMETERS)
+).setParseAction(build_seg_name)
+
+PS_SEG = MatchFirst([
     PS_SEG_SOURCE,
     PS_SEG_OPERATOR,
     PS_SEG_SINK,
@@ -78,14 +72,14 @@ PS_SEG = Or([
 
 
 def build_flow(ts):
-    from actuator.flows.flow import Flow
     kv = dict(list(ts))
     operator = kv.get(keywords.OPERATOR, None)
     sink = kv.get(keywords.SINK, None)
     source = kv.get(keywords.SOURCE, None)
     name = kv.get(keywords.FLOW, None)
     monitor = kv.get(keywords.MONITOR, None)
-    return Flow(source, sink, operator, monitor, name)
+    options = kv.get(SEG_OPTIONS, None)
+    return FlowBlueprint(source, sink, operator, monitor, name, options)
     
 PS_FLOW_EXPRESSION = OneOrMore(PS_SEG).setParseAction(build_flow)
 
@@ -110,7 +104,15 @@ class FlowTests(unittest.TestCase):
         from actuator.components.component import Component
         kw, c = PS_SEG.parseString("via fmt.tojson(pretty=True)")[0]
         self.assertEqual(kw, keywords.OPERATOR)
-        self.assertTrue(isinstance(c, Component))
+        self.assertTrue(isinstance(c.build(keywords.OPERATOR), Component))
+
+    def test_seg_via_chain(self):
+        from actuator.components.operator import SinkOperator
+        kw, c = PS_SEG.parseString("via split(',') | lst.ints > $total")[0]
+        self.assertEqual([code for code, _ in c.links], ['|', '>'])
+        op = c.build(keywords.OPERATOR)
+        self.assertTrue(isinstance(op, SinkOperator))
+        self.assertEqual(len(op.upstreams), 3)
 
     def test_seg_to(self):
         kw, c = PS_SEG.parseString("to var('asdf')")[0]
@@ -119,3 +121,8 @@ class FlowTests(unittest.TestCase):
     def test_seg_on(self):
         kw, c = PS_SEG.parseString("on start")[0]
         self.assertEqual(kw, keywords.MONITOR)
+
+    def test_flow_options(self):
+        flow = PS_FLOW_EXPRESSION.parseString("flow f(engine='compiled') from 'asdf'")[0].build()
+        self.assertEqual(flow.name, 'f')
+        self.assertEqual(flow.option('engine'), 'compiled')
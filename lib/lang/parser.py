@@ -1,27 +1,42 @@
 #!/usr/bin/python3
 
-def parse_flowset(expression):
+#Parses a flowset expression into flows. With `cache`, the parsed blueprints
+#are kept on disk, and an identical expression is later built from them
+#without being parsed again
+def parse_flowset(expression, cache=False):
     from actuator.flows import flowset as mod_flowset
-    from actuator.lang import flows as flowsparser
-    flows = flowsparser.PS_FLOWSET_EXPRESSION.parseString(expression)
-    flowset = mod_flowset.FlowSet(flows)
+    from actuator import startup
+    with startup.phase('parse'):
+        blueprints = parse_blueprints(expression, cache)
+    with startup.phase('construct'):
+        flowset = mod_flowset.FlowSet([b.build() for b in blueprints])
     return flowset
 
-def parse_sink(expression):
+def parse_blueprints(expression, cache=False):
+    if cache:
+        from actuator.lang import cache as mod_cache
+        blueprints = mod_cache.load(expression)
+        if blueprints != None: return blueprints
     from actuator.lang import flows as flowsparser
-    return flowsparser.PS_SEG_SINK_VALUE.parseString(expression)[0]
+    blueprints = list(flowsparser.PS_FLOWSET_EXPRESSION.parseString(expression))
+    if cache: mod_cache.store(expression, blueprints)
+    return blueprints
+
+def parse_sink(expression):
+    from actuator.lang import flows as flowsparser, keywords
+    return flowsparser.PS_SEG_SINK_VALUE.parseString(expression)[0].build(keywords.SINK)
     
 def parse_source(expression):
-    from actuator.lang import flows as flowsparser
-    return flowsparser.PS_SEG_SOURCE_VALUE.parseString(expression)[0]
+    from actuator.lang import flows as flowsparser, keywords
+    return flowsparser.PS_SEG_SOURCE_VALUE.parseString(expression)[0].build(keywords.SOURCE)
 
 def parse_operator(expression):
-    from actuator.lang import flows as flowsparser
-    return flowsparser.PS_SEG_OPERATOR_VALUE.parseString(expression)[0]
+    from actuator.lang import flows as flowsparser, keywords
+    return flowsparser.PS_SEG_OPERATOR_VALUE.parseString(expression)[0].build(keywords.OPERATOR)
 
 def parse_monitor(expression):
-    from actuator.lang import flows as flowsparser
-    return flowsparser.PS_SEG_MONITOR_VALUE.parseString(expression)[0]
+    from actuator.lang import flows as flowsparser, keywords
+    return flowsparser.PS_SEG_MONITOR_VALUE.parseString(expression)[0].build(keywords.MONITOR)
 
 def parse_name(expression):
     from actuator.lang import flows as flowsparser
@@ -5,6 +5,20 @@ import unittest
 from actuator.lang.components import ComponentTests
 from actuator.lang.flows import FlowTests
 from actuator.lang.values import ValueTests
+from actuator.lang.cache import CacheTests
+from actuator.lang.accessor import AccessorTests
+from actuator.frozen import FrozenTests
+from actuator.package import PackageTests
+from actuator.startup import StartupTests
+from actuator.flows.reload import DiffTests, WatcherTests
+from actuator.flows.typecheck import TypeTests
+from actuator.flows.runtime import RuntimeTests
+from actuator.components.sink import LinkTests
+from actuator.components.monitor import MonitorTests
+from actuator.components.decorators import BindTests
+from actuator.components.operator import OperatorTests
+from actuator.packages.sh.sources import StreamTests
+from actuator.packages.file.sources import FollowTests, StatCacheTests
 
 if __name__ == '__main__':
     unittest.main()    
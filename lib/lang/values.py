@@ -1,10 +1,12 @@
 from actuator import util
+import re
 from actuator.lang import symbols
 from actuator.lang.construct import FlowReference, VariableReference
 
-from pyparsing import srange, nums, Word, ZeroOrMore, Suppress, Combine, Optional, QuotedString, Or
+from pyparsing import srange, nums, Word, ZeroOrMore, Suppress, Combine, Optional, QuotedString, MatchFirst, Regex
 
-PS_IDENTIFIER = Word(srange("[a-zA-Z_]"), srange("[a-zA-Z0-9_]"))
+IDENTIFIER = "[a-zA-Z_][a-zA-Z0-9_]*"
+PS_IDENTIFIER = Regex(IDENTIFIER)
 
 PS_DOT_IDENTIFIER = (
     PS_IDENTIFIER + 
@@ -15,51 +17,43 @@ PS_DOT_IDENTIFIER = (
 ).leaveWhitespace()
 
 
-PS_FLOW = (
-    Suppress(symbols.FLOWREF) + PS_IDENTIFIER
-).setParseAction(
-    lambda ts: FlowReference(".".join(ts))
+#Simple tokens are matched with a single regular expression each, rather than
+#being composed from smaller pyparsing elements
+PS_FLOW = Regex(r"{}\s*(?P<name>{})".format(re.escape(symbols.FLOWREF), IDENTIFIER)).setParseAction(
+    lambda ts: FlowReference(ts['name'])
 )
 
-PS_VAR = (
-    Suppress(symbols.VARSTART) + PS_DOT_IDENTIFIER
-).setParseAction(
-    lambda ts: VariableReference(".".join(ts))
+PS_VAR = Regex(r"{}(?P<name>{}(?:{}{})*)".format(re.escape(symbols.VARSTART), IDENTIFIER, re.escape(symbols.IDSEP), IDENTIFIER)).setParseAction(
+    lambda ts: VariableReference(ts['name'])
 )
 
-PS_INT = Combine(
-    Optional("-") + 
-    Word(nums)
-).setParseAction(
+PS_INT = Regex(r"-?[0-9]+").setParseAction(
     lambda ts: int(ts[0])
 )
 
-PS_REAL = Combine(
-    Optional("-") + 
-    Word(nums) + 
-    '.' + 
-    Word(nums)
-).setParseAction(
+PS_REAL = Regex(r"-?[0-9]+\.[0-9]+").setParseAction(
     lambda ts: float(ts[0])
 )
 
-PS_STRING = Or([
+PS_STRING = MatchFirst([
     QuotedString(quoteChar='"'),
     QuotedString(quoteChar="'"),
 ])
 
-PS_BOOL = Or(["True", "False"]).setParseAction(
+PS_BOOL = MatchFirst(["True", "False"]).setParseAction(
     lambda ts: util.parse_bool(ts[0])
 )
 
-PS_PRIMITIVE = Or([
-    PS_INT,
+#Alternatives are tried in order, so a real must be tried before the integer
+#which is its prefix
+PS_PRIMITIVE = MatchFirst([
     PS_REAL,
+    PS_INT,
     PS_STRING,
     PS_BOOL,
 ])
 
-PS_VALUE = Or([
+PS_VALUE = MatchFirst([
     PS_FLOW,
     PS_VAR,
     PS_PRIMITIVE
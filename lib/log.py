@@ -22,6 +22,12 @@ def set_level(l):
     else:
         __level = l
 
+#Whether messages at this level will be shown, so that expensive ones are only
+#built when they are needed
+def enabled(l):
+    if isinstance(l, str): l = LEVEL_NAMES[l]
+    return __level >= l
+
 def error(msg):
     if __level < LEVEL_ERROR: return
     print(msg, flush=True)
@@ -2,6 +2,9 @@
 
 SEP = "."
 
+#The archives each package keeps its items in
+ROLES = ('sources', 'sinks', 'monitors', 'operators')
+
 from actuator import log
 from collections import OrderedDict
 
@@ -11,14 +14,20 @@ class Archive():
     def __init__(self, name):
         self._items = {}
         self._name = name
+        self._contents = None
     
     @property
     def name(self): return self._name
     
     @property
     def contents(self):
-        sorted_keys = sorted(self._items.keys(), key=lambda k: k if k else '') 
-        return OrderedDict((key, self._items[key]) for key in sorted_keys)
+        if self._contents == None:
+            sorted_keys = sorted(self._items.keys(), key=lambda k: k if k else '') 
+            self._contents = OrderedDict((key, self._items[key]) for key in sorted_keys)
+        return self._contents
+
+    @property
+    def names(self): return list(self.contents.keys())
 
     def get(self, name):
         #name = self.expand(name)
@@ -29,6 +38,7 @@ class Archive():
         if name in self._items:
             raise Exception("Item with name {} is already registered".format(name))
         self._items[name] = item
+        self._contents = None
 
     #def expand(self, name):
     #    if name and self.name:
@@ -64,116 +74,168 @@ class Package:
     
     @property
     def operators(self): return self._operators
-        
 
 
-#Provides a single, coherent view into the entire package system via namespaces
+
+#Stands in for one of the archives of a package which has not been loaded yet.
+#Its names come from the package's manifest, so the package is only loaded
+#once one of them is actually looked up (or the contents are needed)
+class LazyArchive():
+    def __init__(self, package, role, names):
+        self._package = package
+        self._role = role
+        self._names = set(names)
+
+    @property
+    def name(self): return self._package.name
+
+    @property
+    def contents(self): return getattr(self._package.loaded, self._role).contents
+
+    @property
+    def names(self): return sorted(self._names, key=lambda k: k if k else '')
+
+    def get(self, name):
+        if not name in self._names: return None
+        return getattr(self._package.loaded, self._role).get(name)
+
+
+#A package known only by its manifest, a dict from each of `sources`, `sinks`,
+#`monitors` and `operators` to the names of the items the package registers
+#there. `load` is called to import and build the real package on first use
+class LazyPackage(Package):
+    def __init__(self, name, manifest, load):
+        import threading
+        self._name = name
+        self._load = load
+        self._loaded = None
+        self._lock = threading.Lock()
+        self._sources = LazyArchive(self, 'sources', manifest.get('sources', []))
+        self._sinks = LazyArchive(self, 'sinks', manifest.get('sinks', []))
+        self._monitors = LazyArchive(self, 'monitors', manifest.get('monitors', []))
+        self._operators = LazyArchive(self, 'operators', manifest.get('operators', []))
+
+    @property
+    def is_loaded(self): return self._loaded != None
+
+    @property
+    def loaded(self):
+        with self._lock:
+            if self._loaded == None:
+                log.debug("Loading package {}".format(self.name))
+                package = self._load()
+                if not package or package.name != self.name:
+                    raise Exception("Package {} did not load as described by its manifest".format(self.name))
+                self._loaded = package
+            return self._loaded
+
+
+#Provides a single, coherent view into the entire package system via namespaces.
+#Names are resolved through an index built from all loaded packages on first
+#use; call invalidate() after loading any more packages
 class Registry:
     def __init__(self):
-        pass
-    
+        self.invalidate()
+
+    def invalidate(self):
+        self._packages = None
+        self._index = None
+        self._names = None
+
     @property
     def source_names(self):
-        return self.item_names(lambda p: p.sources)
+        return self.item_names('sources')
 
     @property
     def sink_names(self):
-        return self.item_names(lambda p: p.sinks)
+        return self.item_names('sinks')
     
     @property
     def monitor_names(self):
-       return self.item_names(lambda p: p.monitors)
+       return self.item_names('monitors')
 
     @property
     def operator_names(self):
-        return self.item_names(lambda p: p.operators)
+        return self.item_names('operators')
 
-    def item_names(self, get_archive):
-        names = [] 
-        for package in self.packages:
-            for itemname, item in get_archive(package).contents.items():
-                name = ""
-                if package.name: name += package.name
-                if package.name and itemname: name += SEP
-                if itemname: name += itemname
-                names.append(name)
-        return names
+    def item_names(self, role):
+        if self._names == None: self.build_index()
+        return list(self._names[role])
 
     @property
     def packages(self):
-        ps = []
-        for loader in loaders:
-            for packagename, package in loader.packages.contents.items():
-                ps.append(package)
-        ps = sorted(ps, key=lambda k: k.name if k and k.name else '')
-        return ps
+        if self._packages == None:
+            ps = []
+            for loader in loaders:
+                for packagename, package in loader.packages.contents.items():
+                    ps.append(package)
+            self._packages = sorted(ps, key=lambda k: k.name if k and k.name else '')
+        return self._packages
     
     def get_package(self, name):
-        for loader in loaders:
-            if name in loader.packages.contents:
-                return loader.packages.contents[name]
+        for package in self.packages:
+            if package.name == name: return package
         return None
 
+    #Maps every name an item can be looked up by, for each role, to the archive
+    #and item name it resolves to. A bare name is either a packageless builtin
+    #or the default item of a package, and the builtin wins. Builtins sort
+    #first, and packages from earlier loaders before later ones with the same
+    #name, so the first entry for a name is always the one to keep
+    def build_index(self):
+        index = {role: {} for role in ROLES}
+        names = {role: [] for role in ROLES}
+        for package in self.packages:
+            for role in ROLES:
+                archive = getattr(package, role)
+                for itemname in archive.names:
+                    name = SEP.join(n for n in (package.name, itemname) if n)
+                    index[role].setdefault(name, (archive, itemname))
+                    names[role].append(name)
+        self._index = index
+        self._names = names
 
-    def lookup_item(self, name, get_archive):
-        if not SEP in name:
-            #This could be one of two things. This could be a packageless 
-            #builtin or this could be a default item in a package. We
-            #try to resolve the packageless builtin first
-            
-            #Try to find this as a built-in
-            for loader in loaders:
-                package = loader.packages.get(None)
-                if package:
-                    source = get_archive(package).get(name)
-                    if source: return source
-                    
-            #Then try to find a matching package with a default item
-            for loader in loaders:
-                package = loader.packages.get(name)
-                if package:
-                    source = get_archive(package).get(None)
-                    if source: return source
-                    
-        else:
-            pkgname, itemname = name.split(SEP)
-            for loader in loaders:
-                package = loader.packages.get(pkgname)
-                if package:
-                    source = get_archive(package).get(itemname)
-                    if source: return source
-            
+    #Returns the builder for the named item in the given role, one of
+    #`sources`, `sinks`, `monitors` or `operators`
+    def lookup_item(self, name, role):
+        if self._index == None: self.build_index()
+        entry = self._index[role].get(name)
+        if not entry: return None
+        archive, itemname = entry
+        return archive.get(itemname)
     
     def lookup_source(self, name):
-        return self.lookup_item(name, lambda p: p.sources)
+        return self.lookup_item(name, 'sources')
     
     def lookup_sink(self, name):
-        return self.lookup_item(name, lambda p: p.sinks)
+        return self.lookup_item(name, 'sinks')
         
     def lookup_monitor(self, name):
-        return self.lookup_item(name, lambda p: p.monitors)
+        return self.lookup_item(name, 'monitors')
         
     def lookup_operator(self, name):
-        return self.lookup_item(name, lambda p: p.operators)
+        return self.lookup_item(name, 'operators')
         
-    def build_item(self, name, get_archive, *args, **kwargs):
-        item = self.lookup_item(name, get_archive)
+    def build_item(self, name, role, *args, **kwargs):
+        item = self.lookup_item(name, role)
+        if not item:
+            raise Exception("Could not find {} in {}".format(name, role))
         component = item(*args, **kwargs)
         component.set_name(name)
         return component
         
         
     def build_source(self, name, *args, **kwargs):
-        return self.build_item(name, lambda p: p.sources, *args, **kwargs)
+        return self.build_item(name, 'sources', *args, **kwargs)
         
     def build_sink(self, name, *args, **kwargs):
-        return self.build_item(name, lambda p: p.sinks, *args, **kwargs)
+        return self.build_item(name, 'sinks', *args, **kwargs)
         
     def build_monitor(self, name, *args, **kwargs):
-        return self.build_item(name, lambda p: p.monitors, *args, **kwargs)
+        return self.build_item(name, 'monitors', *args, **kwargs)
         
     def build_operator(self, name, *args, **kwargs):
-        return self.build_item(name, lambda p: p.operators, *args, **kwargs)
+        return self.build_item(name, 'operators', *args, **kwargs)
         
         
 
@@ -210,11 +272,17 @@ class LocalPackageLoader(Loader):
             except:
                 log.warn("Failed to load package " + entry.name)
     
+    #Packages with a manifest are only indexed here, their modules are imported
+    #when the first item is looked up. Packages without one are loaded now
     def load(self, name):
         import importlib
         try:
             m = importlib.import_module("actuator.packages.{}".format(name))
-            package = m.load()
+            manifest = getattr(m, 'MANIFEST', None)
+            if manifest != None:
+                package = LazyPackage(name, manifest, m.load)
+            else:
+                package = m.load()
             if not package: return
             self.packages.register_item(package.name, package)
         except:
@@ -248,6 +316,48 @@ loaders = [LocalPackageLoader(), BuiltinLoader()]
 
 REGISTRY = Registry()
 
+
+
+import unittest
+class PackageTests(unittest.TestCase):
+
+    def test_lazy(self):
+        loads = []
+        def load():
+            loads.append(1)
+            p = Package('test')
+            p.operators.register_item('a', 'item a')
+            return p
+        p = LazyPackage('test', {'operators': ['a']}, load)
+        self.assertEqual(p.operators.names, ['a'])
+        self.assertEqual(p.sources.get('a'), None)
+        self.assertEqual(p.operators.get('b'), None)
+        self.assertFalse(p.is_loaded)
+        self.assertEqual(p.operators.get('a'), 'item a')
+        self.assertEqual(p.operators.get('a'), 'item a')
+        self.assertEqual(len(loads), 1)
+
+    def test_index(self):
+        self.assertEqual(REGISTRY.lookup_operator('lst.head'), REGISTRY.get_package('lst').operators.get('head'))
+        self.assertEqual(REGISTRY.lookup_sink('sh'), REGISTRY.get_package('sh').sinks.get(None))
+        self.assertEqual(REGISTRY.lookup_operator('split'), REGISTRY.get_package(None).operators.get('split'))
+        self.assertEqual(REGISTRY.lookup_operator('lst.nope'), None)
+        self.assertEqual(REGISTRY.lookup_operator('lst.head.x'), None)
+        self.assertIn('lst.head', REGISTRY.operator_names)
+        self.assertIn('sh', REGISTRY.sink_names)
+
+    #Every manifest has to name exactly the items its package registers
+    def test_manifests(self):
+        for package in REGISTRY.packages:
+            if not isinstance(package, LazyPackage): continue
+            with self.subTest(package=package.name):
+                try:
+                    loaded = package.loaded
+                except ImportError as e:
+                    self.skipTest("{}: {}".format(package.name, e))
+                for role in ROLES:
+                    self.assertEqual(getattr(package, role).names, getattr(loaded, role).names)
+
 if __name__ == "__main__":
     print(REGISTRY.source_names)
     print(REGISTRY.sink_names)
@@ -1,6 +1,10 @@
-from . import sources, operators
+MANIFEST = {
+    'sources': ['true', 'false'],
+    'operators': [None, 'not', 'all', 'any', 'smooth'],
+}
 
 def load():
+    from . import sources, operators
     from actuator import package
     pkg = package.Package('bool')
 
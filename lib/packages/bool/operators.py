@@ -1,7 +1,7 @@
 from actuator.components.operator import Operator
 from actuator import util
 
-from actuator.components.decorators import parameter, argument, input, output, allarguments, operator
+from actuator.components.decorators import parameter, argument, input, output, allarguments, operator, specialise
 
 
 def tobool(o):
@@ -35,6 +35,7 @@ def negation(payload):
 
     
 
+@specialise('list', lambda self, value: any(value))
 @input('list', 'Any list of values')
 @output('bool', 'True if any values in the list are truthy, False otherwise.')
 class Any(Operator):
@@ -42,13 +43,12 @@ class Any(Operator):
     Accepts a list of items and returns true if any items in the list
     evaluate to truthy. This is a wrapper around Python's builtin 'all' function.
     """
-    @property
-    def value(self):
-        value = self.upstream.value
+    def transform(self, value):
         if not isinstance(value, (list, tuple)):
             value = list(value)
         return any(value)
 
+@specialise('list', lambda self, value: all(value))
 @input('list', 'Any list of values')
 @output('bool', 'True if all values in the list are truthy, False otherwise.')
 class All(Operator):
@@ -56,9 +56,7 @@ class All(Operator):
     Accepts a list of items and returns true if-and-only-if all items in the list
     evaluate to truthy. This is a wrapper around Python's builtin 'all' function.
     """
-    @property
-    def value(self):
-        value = self.upstream.value
+    def transform(self, value):
         if not isinstance(value, (list, tuple)):
             value = list(value)
         return all(value)
@@ -84,13 +82,9 @@ class Smooth(Operator):
         else:
             return 0 if self.params.fast_false else self.params.delay
 
-    @property
-    def value(self):
+    def transform(self, new_result):
         import time
         
-        #get the result from the wrapped state
-        new_result = self.upstream.value
-        
         if new_result != self._last:
             #reset the last change time last known status
             self._last_time = time.time()
@@ -1,6 +1,10 @@
-from . import sources, sinks
+MANIFEST = {
+    'sources': [None],
+    'sinks': [None],
+}
 
 def load():
+    from . import sources, sinks
     from actuator import package
     pkg = package.Package('file')
 
@@ -4,14 +4,234 @@ from actuator.components.decorators import parameter, argument, input, output, a
 
 
 @parameter('binary', 'bool', False, 'Open the file in binary mode')
+@parameter('follow', 'bool', False, 'Emit only what has been appended to the file since it was last read, starting from its end')
+@parameter('lines', 'bool', False, 'When following, emit a list of the complete lines appended, holding back a partial last line')
+@parameter('mmap', 'bool', False, 'When following, read appended data through a memory map of the file')
+@parameter('cache', 'bool', True, 'Emit the contents last read, without reading the file, while its size, inode and modification time are unchanged')
 @argument('filename', 'str', None, 'Name of file from which the payload will be read')
+@output('str, bytes, list[str]', 'Contents of the file, as bytes in binary mode, or the lines appended to it')
 class FileSource(Source):
+    def initialise(self, *args, **kwargs):
+        self._fh = None
+        self._offset = 0
+        self._partial = b''
+        self._encoding = None
+        self._decoder = None
+        self._fingerprint = None
+        self._contents = None
+
     @property
     def value(self):
+        if self.params.follow: return self.follow()
+        fingerprint = None
+        if self.params.cache:
+            import os
+            #Stat before reading, so that a change made during the read is seen
+            #next time
+            st = os.stat(self.args.filename)
+            fingerprint = (st.st_mtime_ns, st.st_size, st.st_ino, st.st_dev)
+            #The same object as last time, which monitors comparing payloads
+            #can tell is unchanged without comparing the contents
+            if fingerprint == self._fingerprint: return self._contents
         read_string = 'r'
         if self.params.binary: read_string = 'rb'
         fh = open(self.args.filename, read_string)
         contents = fh.read()
         fh.close()
+        self._fingerprint = fingerprint
+        self._contents = contents
         return contents
 
+    #Like `tail -F`, keeps the file open and reads from where the last read
+    #ended. A file which has been replaced (eg. rotated) is read to its end
+    #before the new file is opened and read from its start, and a file which
+    #has shrunk (eg. truncated) is read again from its start. The end of a
+    #replaced file ends its last line, even without a newline
+    def follow(self):
+        import os
+        drained = None
+        if self._fh == None:
+            self.open()
+            self._offset = os.fstat(self._fh.fileno()).st_size
+        try:
+            current = os.stat(self.args.filename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self._fh.fileno())
+        if current != None and (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.logger.info("%s was replaced, reading the new file", self.args.filename)
+            drained = self.decode(self.read(), final=True)
+            self._fh.close()
+            self.open()
+        elif opened.st_size < self._offset:
+            self.logger.info("%s was truncated, reading it from the start", self.args.filename)
+            self._offset = 0
+            self._partial = b''
+            self._decoder.reset()
+        data = self.decode(self.read())
+        return drained + data if drained else data
+
+    def open(self):
+        import codecs, locale
+        self._fh = open(self.args.filename, 'rb')
+        self._offset = 0
+        self._encoding = locale.getpreferredencoding(False)
+        self._decoder = codecs.getincrementaldecoder(self._encoding)(errors='replace')
+
+    #Everything from the offset to the current end of the file
+    def read(self):
+        import os
+        size = os.fstat(self._fh.fileno()).st_size
+        if size <= self._offset: return b''
+        if self.params.mmap:
+            import mmap
+            with mmap.mmap(self._fh.fileno(), size, access=mmap.ACCESS_READ) as m:
+                data = m[self._offset:size]
+        else:
+            self._fh.seek(self._offset)
+            data = self._fh.read(size - self._offset)
+        self._offset += len(data)
+        return data
+
+    def decode(self, data, final=False):
+        if self.params.lines:
+            lines = (self._partial + data).split(b'\n')
+            self._partial = lines.pop()
+            if final and self._partial:
+                lines.append(self._partial)
+                self._partial = b''
+            if self.params.binary: return lines
+            return [line.decode(self._encoding, errors='replace') for line in lines]
+        if self.params.binary: return data
+        #Appended data may end part way through a character
+        return self._decoder.decode(data, final)
+
+    def stop(self):
+        if self._fh != None:
+            self._fh.close()
+            self._fh = None
+
+
+
+import unittest
+class FollowTests(unittest.TestCase):
+
+    def setUp(self):
+        import os, tempfile
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._dir.name, 'log')
+        self.write('old\n', 'w')
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def write(self, data, mode='a'):
+        if isinstance(data, str): data = data.encode()
+        with open(self._path, mode + 'b') as fh:
+            fh.write(data)
+
+    def source(self, **kwargs):
+        source = FileSource(self._path, follow=True, **kwargs)
+        source.setup()
+        self.addCleanup(source.stop)
+        return source
+
+    def test_follow(self):
+        for mmap in (False, True):
+            self.write('old\n', 'w')
+            source = self.source(mmap=mmap)
+            self.assertEqual(source.value, '')
+            self.write('a1\na2\npart')
+            self.assertEqual(source.value, 'a1\na2\npart')
+            self.assertEqual(source.value, '')
+
+    def test_lines(self):
+        source = self.source(lines=True)
+        self.assertEqual(source.value, [])
+        self.write('a1\na2\npart')
+        self.assertEqual(source.value, ['a1', 'a2'])
+        self.write('ial\n')
+        self.assertEqual(source.value, ['partial'])
+
+    def test_truncated(self):
+        source = self.source(lines=True)
+        self.assertEqual(source.value, [])
+        self.write('a1\npart')
+        self.assertEqual(source.value, ['a1'])
+        self.write('new\n', 'w')
+        self.assertEqual(source.value, ['new'])
+
+    def test_rotated(self):
+        import os
+        source = self.source(lines=True)
+        self.assertEqual(source.value, [])
+        self.write('part')
+        self.assertEqual(source.value, [])
+        os.rename(self._path, self._path + '.1')
+        self.write('rot1\n', 'w')
+        self.assertEqual(source.value, ['part', 'rot1'])
+
+    def test_multibyte(self):
+        source = self.source()
+        self.assertEqual(source.value, '')
+        if source._encoding.lower().replace('-', '') != 'utf8': self.skipTest("Needs a UTF-8 locale")
+        encoded = 'café\n'.encode()
+        self.write(encoded[:-2])
+        self.assertEqual(source.value, 'caf')
+        self.write(encoded[-2:])
+        self.assertEqual(source.value, 'é\n')
+        #Half a character is dropped along with the rest of a truncated file
+        self.write(encoded[:-2])
+        self.assertEqual(source.value, 'caf')
+        self.write('x\n', 'w')
+        self.assertEqual(source.value, 'x\n')
+
+
+class StatCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        import os, tempfile
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._dir.name, 'config')
+        self.write('abc', 1)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    #Each write is given its own modification time, as writes close together
+    #may otherwise share one
+    def write(self, data, mtime):
+        import os
+        with open(self._path, 'w') as fh:
+            fh.write(data)
+        os.utime(self._path, ns=(mtime * 10**9, mtime * 10**9))
+
+    def reads(self, source, count):
+        import builtins
+        from unittest import mock
+        with mock.patch('builtins.open', wraps=builtins.open) as opened:
+            values = [source.value for _ in range(count)]
+        return values, opened.call_count
+
+    def test_unchanged(self):
+        source = FileSource(self._path)
+        source.setup()
+        first = source.value
+        values, opened = self.reads(source, 3)
+        self.assertEqual(opened, 0)
+        self.assertTrue(all(v is first for v in values))
+
+    def test_rewritten(self):
+        source = FileSource(self._path)
+        source.setup()
+        self.assertEqual(source.value, 'abc')
+        #Same size, new modification time
+        self.write('xyz', 2)
+        self.assertEqual(source.value, 'xyz')
+
+    def test_uncached(self):
+        source = FileSource(self._path, cache=False)
+        source.setup()
+        values, opened = self.reads(source, 3)
+        self.assertEqual(opened, 3)
+        self.assertEqual(values, ['abc'] * 3)
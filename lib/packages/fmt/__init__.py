@@ -1,6 +1,9 @@
-from . import sources, operators
+MANIFEST = {
+    'operators': ['tojson', 'fromjson', 'toyaml', 'fromyaml'],
+}
 
 def load():
+    from . import sources, operators
     from actuator import package
     pkg = package.Package('fmt')
 
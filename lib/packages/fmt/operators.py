@@ -4,32 +4,61 @@ from actuator.components.operator import Operator
 from actuator.components.decorators import parameter, argument, input, output, allarguments, operator
 
 
+def to_json(value, pretty=False):
+    import json
+    if value == None: return None
+    if pretty:
+        return json.dumps(value, indent=4)
+    else:
+        return json.dumps(value)
+
+def from_json(value):
+    import json
+    if value == None: return None
+    return json.loads(value)
+
+def to_yaml(value, unsafe=False, canonical=False, default_flow_style=True):
+    import yaml
+    from actuator import frozen
+    frozen.register_yaml()
+    if value == None: return None
+    if not unsafe:
+        return yaml.safe_dump(value, canonical=canonical)
+    else:
+        return yaml.dump(value, canonical=canonical)
+
+def from_yaml(value, unsafe=False):
+    import yaml
+    if value == None: return None
+    if unsafe:
+        return yaml.load(value)
+    else:
+        return yaml.safe_load(value)
+
+
+#These operators are implemented by their kernel functions, so that they
+#may be run in another process
+class FormatOperator(Operator):
+    def transform(self, value):
+        return self.kernel(value, **self.params.as_dict)
+
+    def transform_batch(self, payloads):
+        kernel = self.kernel
+        params = self.params.as_dict
+        return [kernel(value, **params) for value in payloads]
+
+
 @input('any', 'Any payload')
 @output('str', 'JSON String')
 @parameter('pretty', 'bool', False, 'Apply formatting to JSON output')
-class ToJson(Operator):
-    @property
-    def value(self):
-        import json
-        value = self.upstream.value
-        if value == None: return None
-        if self.params.pretty:
-            return json.dumps(value, indent=4)
-        else:
-            return json.dumps(value)
+class ToJson(FormatOperator):
+    kernel = staticmethod(to_json)
 
 
 @input('str', 'JSON String')
 @output('any', 'Parsed payload')
-class FromJson(Operator):
-    @property
-    def value(self):
-        import json
-        value = self.upstream.value
-        if value == None: return None
-        value = json.loads(value)
-        return value
-        
+class FromJson(FormatOperator):
+    kernel = staticmethod(from_json)
         
 
 @input('any', 'Any payload')
@@ -37,27 +66,12 @@ class FromJson(Operator):
 @parameter('unsafe', 'bool', False, 'Use unsafe PyYAML Dumper')
 @parameter('canonical', 'bool', False, 'Dump YAML in canonical format with explicit types')
 @parameter('default_flow_style', 'bool', True, "PyYAML's 'default_flow_style' argument")
-class ToYaml(Operator):
-    @property
-    def value(self):
-        import yaml
-        value = self.upstream.value
-        if value == None: return None
-        if not self.params.unsafe:
-            return yaml.safe_dump(value, canonical=self.params.canonical)
-        else:
-            return yaml.dump(value, canonical=self.params.canonical)
+class ToYaml(FormatOperator):
+    kernel = staticmethod(to_yaml)
+
 
 @input('str', 'YAML String')
 @output('any', 'Any payload')
 @parameter('unsafe', 'bool', False, 'Use unsafe PyYAML Dumper')
-class FromYaml(Operator):
-    @property
-    def value(self):
-        import yaml
-        value = self.upstream.value
-        if value == None: return None
-        if self.params.unsafe:
-            return yaml.load(value)
-        else:
-            return yaml.safe_load(value)
+class FromYaml(FormatOperator):
+    kernel = staticmethod(from_yaml)
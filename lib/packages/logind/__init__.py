@@ -1,6 +1,9 @@
-from . import sources
+MANIFEST = {
+    'sources': [None, 'locked'],
+}
 
 def load():
+    from . import sources
     from actuator import package
     pkg = package.Package('logind')
     
@@ -1,6 +1,9 @@
-from . import operators
+MANIFEST = {
+    'operators': ['head', 'tail', 'last', 'init', 'slice', 'len', 'reverse', 'join', 'sum', 'avg', 'product', 'max', 'min', 'repeat', 'ints', 'floats', 'feed'],
+}
 
 def load():
+    from . import operators
     from actuator import package
     pkg = package.Package('lst')
     pkg.operators.register_item('head', operators.head)
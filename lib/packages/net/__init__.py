@@ -1,6 +1,10 @@
-from . import sources, sinks
+MANIFEST = {
+    'sources': ['url', 'pingable'],
+    'sinks': ['serve'],
+}
 
 def load():
+    from . import sources, sinks
     from actuator import package
     pkg = package.Package('net')
     pkg.sources.register_item('url', sources.get)
@@ -1,6 +1,9 @@
-from . import sources
+MANIFEST = {
+    'sources': [None, 'get', 'has', 'search', 'names'],
+}
 
 def load():
+    from . import sources
     from actuator import package
     pkg = package.Package('proc')
     
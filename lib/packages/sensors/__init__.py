@@ -1,6 +1,9 @@
-from .sources.temper import sources as temper
+MANIFEST = {
+    'sources': ['temper'],
+}
 
 def load():
+    from .sources.temper import sources as temper
     from actuator import package
     pkg = package.Package('sensors')
     
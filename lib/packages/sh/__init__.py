@@ -1,10 +1,15 @@
-from . import sources, sinks
+MANIFEST = {
+    'sources': [None, 'stdin', 'stream'],
+    'sinks': [None, 'stdout', 'print-if', 'print', 'curses'],
+}
 
 def load():
+    from . import sources, sinks
     from actuator import package
     pkg = package.Package('sh')
     pkg.sources.register_item(None, sources.ShellSource)
-    pkg.sources.register_item('stdin', sources.stdin)
+    pkg.sources.register_item('stdin', sources.StdinSource)
+    pkg.sources.register_item('stream', sources.StreamSource)
     #pkg.sinks.register_item(None, sinks.ShellRunner)
     pkg.sinks.register_item(None, sinks.Shell)
     pkg.sinks.register_item('stdout', sinks.stdout)
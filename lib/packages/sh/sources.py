@@ -4,6 +4,9 @@ from actuator import util
 
 from actuator.components.decorators import parameter, argument, input, output, allarguments, source
 
+@output('str', 'Output of the command')
+@parameter('persistent', 'bool', None, "Run the command in a shell kept running between activations, defaults to the flow's persistent_shell option")
+@parameter('timeout', 'real', None, 'Seconds the command may run before it is killed, failing the activation')
 class ShellSource(Source):
     def initialise(self, *args, **kwargs):
         super().initialise(*args, **kwargs)
@@ -11,28 +14,337 @@ class ShellSource(Source):
         self._shell = False
         if len(self._args) == 1 and ' ' in self._args[0]:
             self._shell = True
+        persistent = self.params.persistent
+        if persistent == None and self.context != None:
+            persistent = self.context.option('persistent_shell', False)
+        self._coprocess = None
+        if util.parse_bool(persistent):
+            import shlex
+            command = self._args[0] if self._shell else " ".join(shlex.quote(str(a)) for a in self._args)
+            self._coprocess = Coprocess(command, self.logger)
         
     @property
     def value(self):
-        proc = subprocess.run(self._args, stdout=subprocess.PIPE, shell=self._shell)
+        timeout = self.params.timeout
+        if timeout != None: timeout = float(timeout)
+        if self._coprocess: 
+            return self._coprocess.run(timeout)
+        try:
+            proc = subprocess.run(self._args, stdout=subprocess.PIPE, shell=self._shell, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise Exception("Command {} timed out after {}s".format(self._args, timeout))
         return proc.stdout.decode()
+    
+    def stop(self):
+        if self._coprocess: self._coprocess.close()
+
+
+#A shell kept running to run the same command over and over, so that each run
+#costs a fork rather than starting a new shell. The command runs in a subshell
+#so that nothing it does is kept for the next run, and its output is read
+#back up to a line with a marker which the command cannot know. A run fails
+#if the shell dies or the command times out, and the shell is replaced on the
+#next run
+class Coprocess:
+    CHUNK_SIZE = 65536
+
+    def __init__(self, command, logger):
+        import uuid
+        self._command = command
+        self._logger = logger
+        self._marker = "\n{}\n".format(uuid.uuid4().hex).encode()
+        self._script = "( {}\n) </dev/null\nprintf '{}'\n".format(command, self._marker.decode().replace("\n", "\\n")).encode()
+        self._proc = None
+        import threading, atexit
+        self._lock = threading.Lock()
+        #Its own session keeps the shell from the terminal's signals, so it
+        #has to be ended when actuator exits, however that happens
+        atexit.register(self.close)
+
+    def open(self):
+        #A new session, so that the shell can be killed along with whatever
+        #it is running, without killing actuator
+        self._proc = subprocess.Popen(['/bin/sh'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, start_new_session=True)
+        self._logger.debug("Started shell %s for %s", self._proc.pid, self._command)
+
+    #Not under the lock, as a run may be waiting on the command
+    def close(self):
+        self.kill()
+
+    def kill(self):
+        proc, self._proc = self._proc, None
+        if proc != None: kill_session(proc)
+
+    def run(self, timeout=None):
+        with self._lock:
+            if self._proc == None or self._proc.poll() != None:
+                self.kill()
+                self.open()
+            proc = self._proc
+            try:
+                proc.stdin.write(self._script)
+                proc.stdin.flush()
+                return self.read(proc, timeout)
+            except Exception:
+                self.kill()
+                raise
+
+    def read(self, proc, timeout):
+        import os, select, time
+        fd = proc.stdout.fileno()
+        deadline = None if timeout == None else time.time() + timeout
+        data = b''
+        searched = 0
+        while True:
+            end = data.find(self._marker, searched)
+            if end >= 0: return data[:end].decode()
+            searched = max(len(data) - len(self._marker), 0)
+            wait = None if deadline == None else max(deadline - time.time(), 0)
+            ready, _, _ = select.select([fd], [], [], wait)
+            if not ready:
+                raise Exception("Command {} timed out after {}s".format(self._command, timeout))
+            chunk = os.read(fd, Coprocess.CHUNK_SIZE)
+            if not chunk:
+                raise Exception("Shell running {} exited".format(self._command))
+            data += chunk
         
+#Kills a process started in a session of its own, along with anything it is
+#running
+def kill_session(proc):
+    import os, signal
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    proc.wait()
+    for pipe in (proc.stdin, proc.stdout):
+        if pipe: pipe.close()
+
+
+@parameter('split', 'bool', True, 'Emit one payload per line, rather than whatever output is available')
+@parameter('backoff', 'real', 1, 'Seconds to wait before restarting the command once it exits')
+@parameter('max_backoff', 'real', 60, 'Longest wait before a restart, as the wait doubles while the command keeps exiting')
+@output('str', 'A line, or a chunk, of the output of the command')
+class StreamSource(Source):
+    """
+    Keeps a command running, emitting its output as it is written. The
+    command is restarted if it exits, eg. `sh.stream('journalctl -f')`
+    """
+    shareable = False
+
+    def initialise(self, *args, **kwargs):
+        import threading
+        self._args = args
+        self._shell = len(args) == 1 and ' ' in args[0]
+        self._proc = None
+        self._reader = None
+        self._started = None
+        self._backoff = float(self.params.backoff)
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        #The command runs in its own session, out of reach of the terminal
+        import atexit
+        atexit.register(self.stop)
+    
+    def suggest_monitor(self):
+        from actuator.package import REGISTRY
+        return REGISTRY.build_monitor('input')
+    
+    #The reader for the running command, starting it first if need be. When
+    #the command has ended, waits out the backoff before starting it again
+    def reader(self):
+        import time
+        if self._stopped.is_set():
+            if self._proc != None: kill_session(self._proc)
+            self._proc = None
+            return None
+        if self._reader != None and not self._reader.eof: return self._reader
+        if self._proc != None:
+            kill_session(self._proc)
+            self._proc = None
+            #A command which ran for longer than the wait has not been failing
+            if time.time() - self._started > self._backoff:
+                self._backoff = float(self.params.backoff)
+            self.logger.warn("Command %s exited, restarting in %ss", self._args, self._backoff)
+            if self._stopped.wait(self._backoff): return None
+            self._backoff = min(self._backoff * 2, float(self.params.max_backoff))
+        if self._stopped.is_set(): return None
+        self._proc = subprocess.Popen(self._args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, shell=self._shell, start_new_session=True)
+        self._started = time.time()
+        self._reader = LineReader(self._proc.stdout.fileno())
+        return self._reader
+    
+    @property
+    def value(self):
+        payloads = self.batch(1)
+        return payloads[0] if payloads else None
+    
+    def batch(self, size, linger=0):
+        with self._lock:
+            while True:
+                reader = self.reader()
+                if reader == None: return []
+                if self.params.split:
+                    lines = reader.read(size, linger)
+                else:
+                    lines = reader.read_chunk()
+                payloads = [reader.decode(line) for line in lines]
+                #A chunk of nothing but part of a character has nothing to emit
+                if not self.params.split: payloads = [p for p in payloads if p]
+                if payloads: return payloads
+    
+    #The pipe is left for a read which may be waiting on it to find closed
+    def stop(self):
+        self._stopped.set()
+        proc = self._proc
+        if proc != None: 
+            import os, signal
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+
+
 @parameter('split', 'bool', True, 'Split inputs by line')
-@source
-def stdin(split=True):
-    import sys
+class StdinSource(Source):
+    """
+    Reads from standard input, either one line at a time or all at once
+    """
+    shareable = False
+
+    def initialise(self, *args, **kwargs):
+        self._exhausted = False
+
+    @property
+    def value(self):
+        import sys
 
-    if sys.stdin.closed: 
-        return None
+        if sys.stdin.closed: 
+            return None
+        
+        if not self.params.split:
+            lines = []
+            for line in sys.stdin:
+                if not line: break 
+                lines.append(line.strip())
+            return "\n".join(lines)
+        else:
+            line = sys.stdin.readline()
+            if not line: return None
+            return line.strip()
+
+    def batch(self, size, linger=0):
+        import sys
+        #Without splitting, the first batch reads all of the input
+        if sys.stdin.closed or self._exhausted: return []
+        if not self.params.split:
+            self._exhausted = True
+            return [self.value]
+        lines = stdin_reader().read(size, linger)
+        return [line.decode().strip() for line in lines]
+
+
+#Reads lines from a file descriptor in large chunks, so that a batch of lines 
+#can be collected without a readline call for each one
+class LineReader:
+    CHUNK_SIZE = 65536
     
-    if not split:
-        lines = []
-        for line in sys.stdin:
-            if not line: break 
-            lines.append(line.strip())
-        return "\n".join(lines)
-    else:
-        line = sys.stdin.readline()
-        if not line: return None
-        return line.strip()
+    def __init__(self, fd):
+        import codecs
+        self._fd = fd
+        self._lines = []
+        self._partial = b''
+        self._eof = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+    @property
+    def eof(self): return self._eof and not self._lines
+    
+    #Blocks until at least one line is available or the input has ended, 
+    #then waits up to `linger` seconds for up to `count` lines in total
+    def read(self, count, linger=0):
+        import time
+        while not self._lines and not self._eof:
+            self.fill(None)
+        deadline = time.time() + linger
+        while len(self._lines) < count and not self._eof:
+            if not self.fill(max(deadline - time.time(), 0)): break
+        lines = self._lines[:count]
+        self._lines = self._lines[count:]
+        return lines
+    
+    #Blocks until some input is available or the input has ended, then
+    #returns everything read so far as a single chunk
+    def read_chunk(self):
+        while not self._lines and not self._partial and not self._eof:
+            self.fill(None)
+        chunk = b'\n'.join(self._lines + [self._partial])
+        self._lines = []
+        self._partial = b''
+        return [chunk] if chunk else []
+    
+    #Lines or chunks in the order they were read. A chunk may end part way
+    #through a character, which is held back until the rest is read
+    def decode(self, data):
+        return self._decoder.decode(data, self.eof)
+    
+    #Reads whatever is available within `timeout` seconds, returning
+    #False if nothing was read
+    def fill(self, timeout):
+        import os, select
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready: return False
+        chunk = os.read(self._fd, LineReader.CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            if self._partial: self._lines.append(self._partial)
+            self._partial = b''
+            return False
+        lines = (self._partial + chunk).split(b'\n')
+        self._partial = lines.pop()
+        self._lines.extend(lines)
+        return True
+
+__stdin_reader = None
+def stdin_reader():
+    import sys
+    global __stdin_reader
+    if not __stdin_reader: 
+        __stdin_reader = LineReader(sys.stdin.fileno())
+    return __stdin_reader
+
+
+
+
+import unittest
+class StreamTests(unittest.TestCase):
+
+    def test_stop(self):
+        import time
+        from actuator.lang import parser
+        flowset = parser.parse_flowset("flow s from sh.stream('echo a; sleep 10', backoff=0) to $out")
+        flowset.setup()
+        flowset.start()
+        flowset.startup_wait()
+        flow = flowset.flows[0]
+        source = flow.source
+        deadline = time.time() + 5
+        while not flow.scope.has_local('out') and time.time() < deadline: time.sleep(0.01)
+        proc = source._proc
+        flowset.remove([flow], timeout=5)
+        self.assertFalse(flow._thread.is_alive())
+        #The command was killed and reaped rather than restarted, and nothing
+        #was emitted for it ending
+        self.assertNotEqual(proc.poll(), None)
+        self.assertEqual(source._proc, None)
+        self.assertEqual(flow.scope.get_local('out'), 'a')
 
+    #A character split across writes is not lost, and one which cannot be
+    #decoded is replaced rather than ending the flow
+    def test_split_character(self):
+        source = StreamSource("printf 'caf\\303'; sleep 0.5; printf '\\251 \\377\\n'; sleep 10", split=False, backoff=0)
+        source.setup()
+        self.addCleanup(source.stop)
+        self.assertEqual(source.value, 'caf')
+        self.assertEqual(source.value, '\u00e9 \ufffd\n')
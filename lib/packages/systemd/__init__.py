@@ -1,6 +1,10 @@
-from . import sinks, sources
+MANIFEST = {
+    'sources': [None, 'state', 'active'],
+    'sinks': ['toggle'],
+}
 
 def load():
+    from . import sinks, sources
     from actuator import package
     pkg = package.Package('systemd')
     
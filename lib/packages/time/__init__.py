@@ -1,6 +1,10 @@
-from . import sources, operators
+MANIFEST = {
+    'sources': [None, 'stamp', 'epoch', 'during'],
+    'operators': ['interval'],
+}
 
 def load():
+    from . import sources, operators
     from actuator import package
     pkg = package.Package('time')
     
@@ -1,6 +1,11 @@
-from . import sources, operators, sinks
+MANIFEST = {
+    'sources': [None],
+    'operators': ['set'],
+    'sinks': [None],
+}
 
 def load():
+    from . import sources, operators, sinks
     from actuator import package
     pkg = package.Package('var')
     
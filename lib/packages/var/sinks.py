@@ -8,6 +8,8 @@ class Set(Sink):
         self._claimed = False
 
     def perform(self, payload):
+        from actuator import frozen
+        payload = frozen.freeze_for(self.context, payload)
         scope = self.context.scope
         scope.set(self._varname, payload, claim=(not self._claimed))
         self._claimed = True
@@ -3,6 +3,9 @@ from actuator import log, util
 import time
 
 class Get(Source):
+    #Variables are looked up in the scope of the flow reading them
+    shareable = False
+
     def initialise(self, *args, **kwargs):
         super().initialise(*args, **kwargs)
         self._varname = args[0]
@@ -11,7 +14,8 @@ class Get(Source):
     @property
     def value(self):
         scope = self.context.scope
-        #TODO: pickle-copy?
+        #Values are shared by reference, flows which need them to be safe
+        #from other readers should set the `frozen` option
         while not scope.has(self._varname):
             if self._wait:
                 time.sleep(1)
@@ -0,0 +1,141 @@
+#Measures where the time goes between running `act` and its flows starting,
+#for `act --startup-profile`. Once enabled, every module imported is timed as
+#it executes, and the phases of building a flowset (parse, construct,
+#set_context, wire, setup) are timed wherever they are wrapped in `phase`.
+#Nothing is recorded unless profiling has been enabled
+import sys, time, threading
+
+__enabled = False
+__lock = threading.Lock()
+__phases = {}
+__imports = []
+__local = threading.local()
+__started = None
+
+def enabled(): return __enabled
+
+#Starts timing imports and phases. Only imports after this call are seen, so
+#it should be called before anything else is imported
+def enable():
+    global __enabled, __started
+    if __enabled: return
+    __enabled = True
+    __started = time.perf_counter()
+    sys.meta_path.insert(0, ImportTimer())
+
+
+#Times a stage of startup. Phases which run more than once, like setting up
+#each flow, are added up
+class phase:
+    def __init__(self, name):
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        if enabled(): self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self._start == None: return
+        record_phase(self._name, time.perf_counter() - self._start)
+
+def record_phase(name, elapsed):
+    with __lock:
+        total, count = __phases.get(name, (0, 0))
+        __phases[name] = (total + elapsed, count + 1)
+
+def phases():
+    with __lock:
+        return dict(__phases)
+
+
+#Finds modules with the other finders, and has the loader of each time the
+#module's execution. Time spent importing other modules from within a module
+#is counted in its cumulative time but not its own
+class ImportTimer:
+    def find_spec(self, name, path=None, target=None):
+        spec = None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'): continue
+            spec = finder.find_spec(name, path, target)
+            if spec != None: break
+        if spec == None: return None
+        loader = spec.loader
+        #Builtin and frozen modules are loaded by a class shared by all of them
+        if loader != None and not isinstance(loader, type) and hasattr(loader, 'exec_module'):
+            try:
+                loader.exec_module = timed_exec(name, loader.exec_module)
+            except AttributeError:
+                pass
+        return spec
+
+def timed_exec(name, exec_module):
+    def exec_module_timed(module):
+        stack = getattr(__local, 'stack', None)
+        if stack == None: stack = __local.stack = []
+        stack.append(0)
+        start = time.perf_counter()
+        try:
+            return exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack: stack[-1] += elapsed
+            with __lock:
+                __imports.append((name, elapsed - children, elapsed))
+    return exec_module_timed
+
+
+#The slowest imports by cumulative time, followed by the phases in the order
+#they first ran
+def report(limit=25):
+    with __lock:
+        imports = sorted(__imports, key=lambda i: -i[2])
+    recorded = list(phases().items())
+    lines = ["Startup profile", ""]
+    lines.append("  {:<48} {:>10} {:>10}".format("import", "self ms", "total ms"))
+    for name, own, cumulative in imports[:limit]:
+        lines.append("  {:<48} {:>10.1f} {:>10.1f}".format(name, own * 1000, cumulative * 1000))
+    if len(imports) > limit:
+        lines.append("  ... {} more".format(len(imports) - limit))
+    lines.append("  {:<48} {:>10.1f}".format("all {} imports".format(len(imports)), sum(i[1] for i in imports) * 1000))
+    lines.append("")
+    lines.append("  {:<48} {:>10} {:>10}".format("phase", "runs", "total ms"))
+    for name, (total, count) in recorded:
+        lines.append("  {:<48} {:>10} {:>10.1f}".format(name, count, total * 1000))
+    if __started != None:
+        lines.append("  {:<48} {:>10} {:>10.1f}".format("since profiling began", "", (time.perf_counter() - __started) * 1000))
+    return "\n".join(lines) + "\n"
+
+
+
+import unittest
+class StartupTests(unittest.TestCase):
+
+    #Seconds a trivial expression may take to run from a cold start, in a new
+    #interpreter. Override with ACTUATOR_STARTUP_BUDGET on slow machines
+    BUDGET = 0.5
+
+    def test_cold_start(self):
+        import os, subprocess
+        lib = os.path.dirname(os.path.realpath(__file__))
+        act = os.path.join(os.path.dirname(lib), 'bin', 'act')
+        if not os.path.exists(act): self.skipTest("bin/act is not available")
+        env = dict(os.environ)
+        #The directory this copy of actuator was imported from
+        pythonpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join(p for p in (pythonpath, env.get('PYTHONPATH')) if p)
+        budget = float(os.environ.get('ACTUATOR_STARTUP_BUDGET', self.BUDGET))
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, act, '--no-cache', "from 'x'"], env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            elapsed = time.perf_counter() - start
+            self.assertEqual(result.stdout.decode().strip(), 'x')
+            best = elapsed if best == None else min(best, elapsed)
+        self.assertLess(best, budget, "Cold start took {:.0f}ms, over the {:.0f}ms budget".format(best * 1000, budget * 1000))
+
+    def test_phase(self):
+        #Phases are only recorded once profiling is enabled
+        with phase('test'): pass
+        self.assertEqual('test' in phases(), enabled())
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+#Rough timings for the parts of startup which grow with the size of a
+#flowset. Run with actuator importable, eg:
+#
+#    PYTHONPATH=... python3 tests/benchmark.py [flows]
+
+import sys, time
+
+
+#A flowset of generated per-host checks, each with a handful of decorated
+#components
+def generated_flowset(count):
+    return "\n".join(
+        'flow check{i} from "host{i},80,up" via split(",") | lst.last | eq("up") | not to $status{i} on start;'.format(i=i)
+        for i in range(count)
+    )
+
+def timed(name, fn, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    print("{:<24} {:>10.1f} ms".format(name, best * 1000))
+    return result
+
+
+def bench_construct(count):
+    from actuator.package import REGISTRY
+    builders = [REGISTRY.lookup_operator(name) for name in ("split", "eq", "not", "str")]
+    def construct():
+        return [builder(",") for _ in range(count) for builder in builders]
+    timed("construct x{}".format(count * len(builders)), construct, repeat=3)
+
+
+#Activations of a set up function operator, the innermost loop of most flows
+def bench_activation(count):
+    from actuator.package import REGISTRY
+    op = REGISTRY.lookup_operator('lst.slice')(1, 3)
+    op.setup()
+    payload = [1, 2, 3, 4]
+    def activate():
+        for _ in range(count): op.transform(payload)
+    timed("transform x{}".format(count), activate, repeat=3)
+
+
+#Parsing alone for a larger flowset, and reading it back from a cache kept
+#apart from the user's own
+def bench_parse(count):
+    import os, tempfile
+    from actuator.lang import parser
+    expression = generated_flowset(count)
+    timed("parse {} flows".format(count), lambda: parser.parse_blueprints(expression))
+    previous = os.environ.get('XDG_CACHE_HOME')
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['XDG_CACHE_HOME'] = directory
+        try:
+            parser.parse_blueprints(expression, cache=True)
+            timed("cached {} flows".format(count), lambda: parser.parse_blueprints(expression, cache=True))
+        finally:
+            if previous == None:
+                del os.environ['XDG_CACHE_HOME']
+            else:
+                os.environ['XDG_CACHE_HOME'] = previous
+
+
+def bench_flowset(count):
+    from actuator.lang import parser
+    #Leave the cost of importing the grammar out of the parse timing
+    parser.parse_flowset(generated_flowset(1))
+    expression = generated_flowset(count)
+    flowset = timed("parse {} flows".format(count), lambda: parser.parse_flowset(expression))
+    timed("context+wire", lambda: flowset.setup())
+    def setup():
+        for flow in flowset.flows: flow.setup()
+    timed("component setup", setup)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    bench_construct(count * 10)
+    bench_activation(count * 1000)
+    bench_flowset(count)
+    bench_parse(count * 10)
@@ -3,7 +3,11 @@
 
 function test() {
 	echo "-= Testing $1 =-"
-	./$1.act | diff $1.out -
+	if [ -e $1.in ]; then
+		./$1.act < $1.in | diff $1.out -
+	else
+		./$1.act | diff $1.out -
+	fi
 	if [ $? -eq "1" ]; then
 		echo "   [FAILED]"
 	else
@@ -22,3 +26,14 @@ test "subflows"
 test "flowref"
 test "autoinflow"
 test "interval"
+test "engine"
+test "batch"
+test "batchall"
+test "offload"
+test "mapworkers"
+test "queue"
+test "frozen"
+test "explain"
+test "share"
+test "shell"
+test "stream"